@@ -4,7 +4,7 @@ from abc import ABC, abstractmethod
 
 # Import the Any, Dict, and List types from the typing module.
 # These are used to add type hints to the methods.
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 
 # Define an abstract base class named IDataManager.
@@ -37,3 +37,35 @@ class IDataManager(ABC):
     @abstractmethod
     def delete(self, id: Any) -> None:
         pass
+
+    # The scan method: You provide how many items you want per batch.
+    # It yields every stored item in batches, each item as a dictionary with 'id', 'vector' and 'metadata' keys.
+    @abstractmethod
+    def scan(self, batch_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        pass
+
+    # The bulk_create method: You provide a list of items in the same format that scan yields.
+    # The items are stored as they are, with their existing IDs and vectors.
+    @abstractmethod
+    def bulk_create(self, records: List[Dict[str, Any]]) -> None:
+        pass
+
+    # The list_page method: You provide the cursor returned by the previous page (or None for the first page),
+    # the maximum number of items you want, and optionally a dictionary of metadata values the items must match.
+    # It returns the page of items, each with 'id' and 'metadata' keys, and the cursor for the next page (None on the last page).
+    @abstractmethod
+    def list_page(
+        self, cursor: Optional[str] = None, limit: int = 100, filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        pass
+
+    # The get_many method: You provide a list of ids and it returns the items that exist, each with 'id' and 'metadata' keys.
+    @abstractmethod
+    def get_many(self, ids: List[Any]) -> List[Dict[str, Any]]:
+        pass
+
+    # The delete_many method: You provide either a list of ids or a dictionary of metadata values to match.
+    # It returns the ids of the deleted items.
+    @abstractmethod
+    def delete_many(self, ids: Optional[List[Any]] = None, filter: Optional[Dict[str, Any]] = None) -> List[Any]:
+        pass
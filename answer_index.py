@@ -0,0 +1,232 @@
+import hashlib
+import json
+import re
+import threading
+
+# Questions whose stored vector scores at least this cosine similarity against the query are treated as near-exact copies.
+NEAR_EXACT_THRESHOLD = 0.97
+
+
+class AnswerIndex:
+    """
+    AnswerIndex class keeps an in-memory lookup of stored questions and their curated answers.
+    It lets the ChatEngine answer verbatim or near-verbatim copies of known questions without calling the LLM.
+    """
+
+    def __init__(self, threshold=NEAR_EXACT_THRESHOLD):
+        """
+        Initialize an empty index.
+
+        Args:
+            threshold (float): The minimum similarity score for a vector match to count as a near-exact hit.
+        """
+        self.threshold = threshold
+        # Maps the hash of a normalized question to its entries, keyed by QA pair ID.
+        # The same question can be stored under several IDs, in which case the most recently added one answers it.
+        self.entries = {}
+        # Maps a QA pair ID to the hash of its question so deletes and updates can find the old entry.
+        self.keys_by_id = {}
+        # Maps the hash of a popular question to an answer the LLM wrote for it ahead of time.
+        # These sit below the curated entries and are dropped whenever a curated entry changes.
+        self.precomputed = {}
+        # Reentrant so replace_precomputed can check the version while holding it
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def normalize(text):
+        """
+        Normalize a question so that trivial differences in case, punctuation and whitespace don't matter.
+
+        Args:
+            text (str): The question text.
+
+        Returns:
+            str: The normalized question.
+        """
+        text = re.sub(r"[^\w\s]", " ", text.lower())
+        return " ".join(text.split())
+
+    def key(self, text):
+        """
+        Hash the normalized form of a question.
+
+        Args:
+            text (str): The question text.
+
+        Returns:
+            str: The hex digest used as the lookup key.
+        """
+        return hashlib.sha1(self.normalize(text).encode("utf-8")).hexdigest()
+
+    def add(self, question, answer, qa_id=None):
+        """
+        Add or replace a QA pair in the index.
+
+        Args:
+            question (str): The question text.
+            answer (str): The curated answer text.
+            qa_id (str): The ID of the QA pair in the vector store, if it has one.
+        """
+        key = self.key(question)
+        with self.lock:
+            # Precomputed answers may have been written from the answer being replaced
+            self.precomputed.clear()
+            if qa_id is not None:
+                # Drop the entry for the previous question text if this ID has been edited.
+                old_key = self.keys_by_id.pop(qa_id, None)
+                if old_key is not None:
+                    self.discard(old_key, qa_id)
+                self.keys_by_id[qa_id] = key
+            self.entries.setdefault(key, {})[qa_id] = {"id": qa_id, "question": question, "answer": answer}
+
+    def remove(self, qa_id):
+        """
+        Remove a QA pair from the index by its ID.
+
+        Args:
+            qa_id (str): The ID of the QA pair in the vector store.
+        """
+        with self.lock:
+            self.precomputed.clear()
+            key = self.keys_by_id.pop(qa_id, None)
+            if key is not None:
+                self.discard(key, qa_id)
+
+    def discard(self, key, qa_id):
+        """
+        Drop one ID's entry for a question, keeping the entries other IDs hold for the same question.
+        This must be called while holding the lock.
+        """
+        entries = self.entries.get(key, {})
+        entries.pop(qa_id, None)
+        if not entries:
+            self.entries.pop(key, None)
+
+    def lookup(self, question):
+        """
+        Look up the stored answer for an exact (after normalization) copy of a known question.
+
+        Args:
+            question (str): The user's question.
+
+        Returns:
+            str: The stored answer, or None if the question isn't in the index.
+        """
+        key = self.key(question)
+        with self.lock:
+            entries = self.entries.get(key)
+            return list(entries.values())[-1]["answer"] if entries else None
+
+    def add_precomputed(self, question, answer):
+        """
+        Add an answer the LLM wrote ahead of time for a popular question.
+        A question that already has a curated entry keeps it.
+
+        Args:
+            question (str): The question text.
+            answer (str): The generated answer text.
+        """
+        key = self.key(question)
+        with self.lock:
+            if key not in self.entries:
+                self.precomputed[key] = answer
+
+    def replace_precomputed(self, answers, version):
+        """
+        Replace the precomputed answers, but only if they were written for the QA pairs this index holds.
+        Otherwise the old answers are still dropped, since they may repeat content that has since been edited or deleted.
+
+        Args:
+            answers (dict): The generated answers keyed by question.
+            version (str): The version of the QA pairs the answers were written from.
+
+        Returns:
+            bool: Whether the answers were loaded.
+        """
+        with self.lock:
+            self.precomputed.clear()
+            if version != self.version():
+                return False
+            for question, answer in answers.items():
+                self.add_precomputed(question, answer)
+        return True
+
+    def lookup_precomputed(self, question):
+        """
+        Look up a precomputed answer for an exact (after normalization) copy of a popular question.
+        Callers should check the curated entries with lookup first.
+
+        Args:
+            question (str): The user's question.
+
+        Returns:
+            str: The precomputed answer, or None if there isn't one.
+        """
+        return self.precomputed.get(self.key(question))
+
+    def lookup_matches(self, matches):
+        """
+        Check the results of a vector search for a near-exact copy of a stored question.
+
+        Args:
+            matches (list): The matches returned by the vector search, best first.
+
+        Returns:
+            str: The stored answer of the top match if it scores above the threshold, otherwise None.
+        """
+        if not matches:
+            return None
+        top_match = matches[0]
+        if top_match["score"] < self.threshold:
+            return None
+        return top_match["metadata"]["answer"]
+
+    def add_records(self, records):
+        """
+        Add QA pairs in the id/metadata format used by the data managers and snapshots.
+
+        Args:
+            records (list): Dictionaries with 'id' and 'metadata' containing the question and answer.
+        """
+        for record in records:
+            metadata = record.get("metadata", {})
+            if metadata.get("question") and metadata.get("answer"):
+                self.add(metadata["question"], metadata["answer"], record["id"])
+
+    def replace_records(self, records):
+        """
+        Replace every curated entry with the QA pairs in records, so pairs that were deleted elsewhere are dropped.
+        The precomputed answers are only cleared if the QA pairs actually changed.
+
+        Args:
+            records (list): Dictionaries with 'id' and 'metadata' containing the question and answer.
+
+        Returns:
+            bool: Whether the QA pairs differ from the ones the index held before.
+        """
+        fresh = AnswerIndex(self.threshold)
+        fresh.add_records(records)
+        changed = fresh.version() != self.version()
+        with self.lock:
+            self.entries, self.keys_by_id = fresh.entries, fresh.keys_by_id
+            if changed:
+                self.precomputed.clear()
+        return changed
+
+    def version(self):
+        """
+        Hash the curated QA pairs so two processes can tell whether they hold the same ones.
+
+        Returns:
+            str: The hex digest of every ID, question and answer in the index.
+        """
+        with self.lock:
+            pairs = sorted(
+                (str(qa_id), entry["question"], entry["answer"])
+                for entries in self.entries.values()
+                for qa_id, entry in entries.items()
+            )
+        return hashlib.sha1(json.dumps(pairs).encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.entries)
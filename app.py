@@ -12,7 +12,9 @@ from flask_limiter import Limiter
 import logging
 import os
 
-from routes import bp
+from routes import bp, chat_engine
+from profiler import init_profiling
+from warmup import start_warm_up
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -48,6 +50,13 @@ app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 # Register the main blueprint with the Flask app so that the routes are exposed
 app.register_blueprint(bp)
 
+# Hook in the request profiler. This does nothing unless PROFILING_ENABLED is set.
+init_profiling(app)
+
+# Warm up connections and caches in the background. Every gunicorn worker imports the app after forking,
+# so each worker warms itself up and reports it through /ready.
+start_warm_up(chat_engine)
+
 
 # Redirect root to Swagger UI
 @app.route("/")
@@ -1,15 +1,30 @@
+import logging
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
 from chat_history import ChatHistory
 from qa_manager import QAManager
-from templates import system_prompt
+from templates import best_practices_template, system_prompt
 
 # Load environment variables
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# The maximum number of batch questions that are searched and answered at the same time.
+BATCH_WORKERS = int(os.getenv("ASK_BATCH_WORKERS", "8"))
+# The embeddings API accepts at most 2048 inputs per call, so a batch can't be larger than that.
+MAX_BATCH_SIZE = 2048
+
+
+def elapsed_ms(start):
+    """
+    Returns the milliseconds since a time.perf_counter() value, rounded for logging.
+    """
+    return round((time.perf_counter() - start) * 1000, 2)
+
 
 class ChatEngine:
     """
@@ -17,9 +32,12 @@ class ChatEngine:
     It uses OpenAI's language model for generating responses based on the input message and best practices fetched from the database.
     """
 
-    def __init__(self):
+    def __init__(self, data_manager=None, query_log=None):
         """
         Initializes the ChatEngine with necessary components and configurations.
+        Args:
+            data_manager (QAManager): The QAManager to share with the routes. A new one is created if not provided.
+            query_log (QueryLog): The log to record each answered question in. Nothing is logged if not provided.
         """
         # Set OpenAI API key
         try:
@@ -32,77 +50,220 @@ class ChatEngine:
         self.chat_history = ChatHistory()
 
         # Initialize DataManager for database interactions
-        self.data_manager = QAManager()
+        self.data_manager = data_manager or QAManager()
+
+        # Record what customers ask, how it was answered and how long each stage took
+        self.query_log = query_log
 
-        # Store the system prompt template
-        self.system_template = system_prompt
+        # Build the system message once. It is sent first on every request so the provider can cache it.
+        self.system_message = {"role": "system", "content": system_prompt}
 
     def process_user_input(self, message):
         """
         Processes the user input, retrieves best practices based on the input, and generates a bot response.
+        Known questions are answered straight from the answer index without calling the LLM.
         Args:
             message (str): The user input message.
         Returns:
-            str: The bot's response.
+            dict: The bot's response, whether it came from the answer index or the precomputed answers, and the token usage if the LLM was called.
         """
         # Add user message to conversation history
         self.chat_history.add_message("user", message)
 
-        # Generate best practices based on user input
-        best_practices = self.generate_best_practice(message)
+        result = self.answer(message)
+
+        self.chat_history.add_message("bot", result["bot_response"])
+
+        return result
+
+    def answer(self, message, query_vector=None, raise_errors=False):
+        """
+        Answers a single message without touching the conversation history.
+        Args:
+            message (str): The user input message.
+            query_vector (list): The embedding of the message, if it has already been created.
+            raise_errors (bool): Raise failed embedding, search or completion calls instead of answering with an apology.
+        Returns:
+            dict: The bot's response, whether it came from the answer index or the precomputed answers, and the token usage if the LLM was called.
+        """
+        start = time.perf_counter()
+        latencies = {}
+
+        # Exact copies of a stored or popular question can be answered straight away
+        result = self.lookup_stored(message, start)
+        if result:
+            return result
+
+        # Reuse a cached embedding of the message if there is one, otherwise create it
+        cache = "miss"
+        if not query_vector:
+            query_vector = self.data_manager.embedding_cache.get(message)
+            if query_vector:
+                cache = "embedding_cache"
+            else:
+                stage_start = time.perf_counter()
+                query_vector = self.data_manager.create_vector_embeddings(message)
+                latencies["embedding_ms"] = elapsed_ms(stage_start)
+                if not query_vector and raise_errors:
+                    raise RuntimeError("Could not create embeddings for the message.")
+
+        # Find the stored QA pairs most similar to the user input
+        if query_vector:
+            stage_start = time.perf_counter()
+            matches = self.find_matches(message, query_vector, raise_errors)
+            latencies["search_ms"] = elapsed_ms(stage_start)
+        else:
+            # The embedding failed, and find_matches would only call the embeddings API again, so answer as if nothing matched
+            matches = []
+        matched_ids = [match["id"] for match in matches]
+
+        # Near-exact copies of a stored question also get the curated response
+        stored_answer = self.data_manager.answer_index.lookup_matches(matches)
+        if stored_answer:
+            self.log_query(message, start, latencies, "answer_index_vector", query_vector, matched_ids)
+            return {"bot_response": stored_answer, "answer_index_hit": True, "precomputed_hit": False, "usage": None}
+
+        # Extracting answers from the query response
+        best_practices = [match["metadata"]["answer"] for match in matches]
 
         # Ensure the response strictly adheres to best practices
         if best_practices:
-            bot_response = self.generate_response(message, best_practices)
+            stage_start = time.perf_counter()
+            bot_response, usage = self.generate_response(message, best_practices, raise_errors)
+            latencies["completion_ms"] = elapsed_ms(stage_start)
         else:
             # If no best practice is found, inform the user
-            bot_response = "I'm sorry, I don't have information on that topic."
+            bot_response, usage = "I'm sorry, I don't have information on that topic.", None
 
-        self.chat_history.add_message("bot", bot_response)
+        self.log_query(message, start, latencies, cache, query_vector, matched_ids)
+        return {"bot_response": bot_response, "answer_index_hit": False, "precomputed_hit": False, "usage": usage}
 
-        return bot_response
+    def lookup_stored(self, message, start):
+        """
+        Answers an exact copy of a stored question with its curated response, or of a popular question with the
+        answer precomputed for it. Curated responses always win over precomputed ones.
+        Args:
+            message (str): The user input message.
+            start (float): The time.perf_counter() value when answering started.
+        Returns:
+            dict: The stored response, or None if the message isn't a known question.
+        """
+        stored_answer = self.data_manager.answer_index.lookup(message)
+        if stored_answer:
+            self.log_query(message, start, {}, cache="answer_index")
+            return {"bot_response": stored_answer, "answer_index_hit": True, "precomputed_hit": False, "usage": None}
+
+        # Precomputed answers were written by the LLM, so they aren't labelled as answer index hits
+        precomputed_answer = self.data_manager.answer_index.lookup_precomputed(message)
+        if precomputed_answer:
+            self.log_query(message, start, {}, cache="precomputed")
+            return {"bot_response": precomputed_answer, "answer_index_hit": False, "precomputed_hit": True, "usage": None}
+        return None
+
+    def log_query(self, message, start, latencies, cache, query_vector=None, matched_ids=None):
+        """
+        Records an answered message in the query log, if there is one.
+        Args:
+            message (str): The user input message.
+            start (float): The time.perf_counter() value when answering started.
+            latencies (dict): The milliseconds spent in each stage.
+            cache (str): Which cache answered the message: answer_index, answer_index_vector, precomputed, embedding_cache or miss.
+            query_vector (list): The embedding of the message, if one was used.
+            matched_ids (list): The IDs of the QA pairs found by the vector search.
+        """
+        if self.query_log is None:
+            return
+        latencies["total_ms"] = elapsed_ms(start)
+        self.query_log.record(message, query_vector, matched_ids, latencies, cache)
+
+    def answer_batch(self, messages):
+        """
+        Answers many messages at once, yielding each result as soon as it is ready.
+        All messages are embedded with one API call, then searched and answered by a bounded pool of workers.
+        A message whose embedding, search or completion fails is reported with an error instead of failing the whole batch.
+        Args:
+            messages (List[str]): The user input messages.
+        Yields:
+            dict: The index of the message in the batch with its response, or with an error.
+        """
+        pending = []
+        for index, message in enumerate(messages):
+            # Exact copies of a stored or popular question don't need an embedding or a worker
+            result = self.lookup_stored(message, time.perf_counter())
+            if result:
+                yield {"index": index, **result}
+            else:
+                pending.append(index)
+
+        if not pending:
+            return
 
-    def generate_best_practice(self, user_message):
+        # Embed every remaining message in one call. If that fails each worker embeds its own message instead.
+        query_vectors = self.data_manager.create_vector_embeddings_batch([messages[index] for index in pending])
+        if len(query_vectors) != len(pending):
+            query_vectors = [None] * len(pending)
+
+        executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+        try:
+            futures = {
+                executor.submit(self.answer, messages[index], query_vector, True): index
+                for index, query_vector in zip(pending, query_vectors)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    yield {"index": index, **future.result()}
+                except Exception as e:
+                    print(f"Error in answering batch message {index}: {e}")
+                    yield {"index": index, "error": str(e)}
+        finally:
+            # Don't start any more work if the caller stops reading the results early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def find_matches(self, user_message, query_vector=None, raise_errors=False):
         """
-        Generates best practices from the database based on the user message using vector search.
+        Finds the stored QA pairs most similar to the user message using vector search.
         Args:
             user_message (str): The user input message.
+            query_vector (list): The embedding of the message, if it has already been created.
+            raise_errors (bool): Raise a failed embedding or search instead of returning no matches.
         Returns:
-            List[str]: A list of best practices or similar responses.
+            list: The matches from the vector search, best first.
         """
         try:
-            # Create vector embeddings for the user message.
-            query_vector = self.data_manager.create_vector_embeddings(user_message)
+            # Create vector embeddings for the user message if the caller didn't provide them.
+            if not query_vector:
+                query_vector = self.data_manager.create_vector_embeddings(user_message)
+                if not query_vector:
+                    raise RuntimeError("Could not create embeddings for the message.")
 
-            # It returns a list of embeddings, so it needs to be converted to a string for the find method.
-            query_vector = " ".join(map(str, query_vector))
-
-            # Find similar responses in the database
-            similar_responses = self.data_manager.find(query_vector)
-
-            # Extracting answers from the query response
-            best_practices = [
-                match["metadata"]["answer"] for match in similar_responses["matches"]
-            ]
+            # Find similar questions in the database
+            similar_responses = self.data_manager.find_by_vector(query_vector)
 
-            return best_practices
+            return similar_responses["matches"]
         except Exception as e:
-            print(f"Error in generating best practices: {e}")
+            print(f"Error in finding similar questions: {e}")
+            if raise_errors:
+                raise
             return []
 
-    def generate_response(self, message, best_practices):
+    def generate_response(self, message, best_practices, raise_errors=False):
         """
         Generates a response using the OpenAI API based on the user message and best practices.
+        The static system message comes first and the retrieved best practices and user message after it,
+        so every request starts with the same cacheable prefix.
         Args:
             message (str): The user input message.
             best_practices (List[str]): A list of best practices.
+            raise_errors (bool): Raise a failed API call instead of answering with an apology.
         Returns:
-            str: The generated response.
+            tuple: The generated response and the token usage reported by the API, or None if the call failed.
         """
         try:
             # Prepare the messages for the API call
             messages = [
-                {"role": "system", "content": self.system_template.format(best_practice="\n".join(best_practices))},
+                self.system_message,
+                {"role": "system", "content": best_practices_template.format(best_practices="\n".join(best_practices))},
                 {"role": "user", "content": message}
             ]
 
@@ -113,8 +274,33 @@ class ChatEngine:
                 temperature=0
             )
 
+            usage = self.get_usage(response)
+            logging.info(f"Prompt tokens: {usage['prompt_tokens']}, cached: {usage['cached_tokens']}")
+
             # Extract and return the generated response
-            return response.choices[0].message.content
+            return response.choices[0].message.content, usage
         except Exception as e:
             print(f"Error in generating response: {e}")
-            return "I'm sorry, I encountered an error while processing your request."
+            if raise_errors:
+                raise
+            return "I'm sorry, I encountered an error while processing your request.", None
+
+    @staticmethod
+    def get_usage(response):
+        """
+        Gets the token usage from a chat completion response.
+        Args:
+            response: The chat completion response.
+        Returns:
+            dict: The prompt, completion and cached prompt token counts.
+            The cached count stays 0 while prompts are below OpenAI's 1024-token caching minimum.
+        """
+        usage = response.usage
+        # Older SDK versions don't declare prompt_tokens_details, so it may be missing or a plain dict
+        details = getattr(usage, "prompt_tokens_details", None) or {}
+        cached_tokens = details.get("cached_tokens") if isinstance(details, dict) else details.cached_tokens
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cached_tokens": cached_tokens or 0,
+        }
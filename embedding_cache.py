@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+
+class EmbeddingCache:
+    """
+    EmbeddingCache class keeps the most recently used text embeddings in memory so repeated questions
+    don't need another call to the embeddings API.
+    """
+
+    def __init__(self, max_size=10000):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size (int): The number of embeddings to keep before the least recently used are dropped.
+        """
+        self.max_size = max_size
+        self.embeddings = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, text):
+        """
+        Get the cached embedding for a text.
+
+        Args:
+            text (str): The embedded text.
+
+        Returns:
+            list: The embedding, or None if it isn't cached.
+        """
+        with self.lock:
+            embedding = self.embeddings.get(text)
+            if embedding is not None:
+                # Mark it as the most recently used
+                self.embeddings.move_to_end(text)
+            return embedding
+
+    def put(self, text, embedding):
+        """
+        Cache the embedding for a text.
+
+        Args:
+            text (str): The embedded text.
+            embedding (list): The embedding of the text.
+        """
+        if not embedding:
+            return
+        with self.lock:
+            self.embeddings[text] = embedding
+            self.embeddings.move_to_end(text)
+            while len(self.embeddings) > self.max_size:
+                self.embeddings.popitem(last=False)
+
+    def __len__(self):
+        return len(self.embeddings)
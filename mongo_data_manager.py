@@ -1,7 +1,7 @@
 import os
 from bson import BSON
 import pymongo
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from pymongo.collection import Collection
 from bson.objectid import ObjectId
 from IDataManager import IDataManager
@@ -74,6 +74,137 @@ class MongoDataManager(IDataManager):
         """
         self.collection.delete_one({"_id": ObjectId(id)})
 
+    def scan(self, batch_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield every document in the collection in batches, converted to the id/vector/metadata format.
+
+        Args:
+            batch_size (int): The number of documents per batch.
+
+        Yields:
+            List[Dict[str, Any]]: A batch of records.
+        """
+        batch = []
+        for document in self.collection.find({}).sort("_id", pymongo.ASCENDING).batch_size(batch_size):
+            batch.append(
+                {
+                    "id": str(document.pop("_id")),
+                    "vector": document.pop("question_vector", []),
+                    "metadata": document,
+                }
+            )
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def bulk_create(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Insert or replace many records in one call, keeping their IDs and vectors.
+
+        Args:
+            records (List[Dict[str, Any]]): Records with 'id', 'vector' and optional 'metadata' keys.
+        """
+        if not records:
+            return
+        # Replace documents that already exist so importing the same snapshot twice is safe, like Pinecone's upsert
+        operations = [
+            pymongo.ReplaceOne(
+                {"_id": self.to_object_id(record["id"])},
+                {"question_vector": record["vector"], **record.get("metadata", {})},
+                upsert=True,
+            )
+            for record in records
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    def to_object_id(id: Any) -> Any:
+        """
+        Convert an ID to an ObjectId when it is one, leaving other IDs (such as imported Pinecone UUIDs) as they are.
+        """
+        return ObjectId(id) if ObjectId.is_valid(id) else id
+
+    @staticmethod
+    def to_record(document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a document to the id/metadata format, leaving out the vector.
+        """
+        document.pop("question_vector", None)
+        return {"id": str(document.pop("_id")), "metadata": document}
+
+    def list_page(
+        self, cursor: Optional[str] = None, limit: int = 100, filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List one page of documents with a range query on _id.
+        Imported snapshots can mix ObjectId and string IDs. MongoDB sorts every string before every ObjectId,
+        but $gt only compares values of the same type, so the cursor records the type of the last ID and a string
+        cursor also matches all ObjectIds.
+
+        Args:
+            cursor (Optional[str]): The cursor returned with the previous page, or None for the first page.
+            limit (int): The maximum number of documents to return.
+            filter (Optional[Dict[str, Any]]): Field values that the documents must match.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: The page of records and the cursor for the next page.
+        """
+        query = dict(filter or {})
+        if cursor:
+            id_type, _, last_id = cursor.partition(":")
+            if id_type == "oid":
+                query["_id"] = {"$gt": ObjectId(last_id)}
+            else:
+                query["$or"] = [{"_id": {"$gt": last_id}}, {"_id": {"$type": "objectId"}}]
+        documents = list(
+            self.collection.find(query, {"question_vector": 0}).sort("_id", pymongo.ASCENDING).limit(limit)
+        )
+        # A full page means there may be more documents after it
+        next_cursor = None
+        if documents and len(documents) == limit:
+            last_id = documents[-1]["_id"]
+            next_cursor = f"oid:{last_id}" if isinstance(last_id, ObjectId) else f"str:{last_id}"
+        records = [self.to_record(document) for document in documents]
+        return records, next_cursor
+
+    def get_many(self, ids: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Retrieve many documents by their IDs with one query.
+
+        Args:
+            ids (List[Any]): The IDs of the documents.
+
+        Returns:
+            List[Dict[str, Any]]: The records of the documents that exist.
+        """
+        query = {"_id": {"$in": [self.to_object_id(id) for id in ids]}}
+        return [self.to_record(document) for document in self.collection.find(query, {"question_vector": 0})]
+
+    def delete_many(self, ids: Optional[List[Any]] = None, filter: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Delete many documents by their IDs, or every document matching a filter.
+
+        Args:
+            ids (Optional[List[Any]]): The IDs of the documents.
+            filter (Optional[Dict[str, Any]]): Field values that the documents must match.
+
+        Returns:
+            List[Any]: The IDs of the deleted documents.
+        """
+        if ids is None:
+            if not filter:
+                raise ValueError("Either ids or a filter is required to delete documents.")
+            query = filter
+        else:
+            query = {"_id": {"$in": [self.to_object_id(id) for id in ids]}}
+        # Find the matching IDs first so only documents that existed are returned to the caller
+        object_ids = [document["_id"] for document in self.collection.find(query, {"_id": 1})]
+        if object_ids:
+            self.collection.delete_many({"_id": {"$in": object_ids}})
+        return [str(id) for id in object_ids]
+
     def vector_search(self, query_vector):
         """
         Perform a vector search in the MongoDB collection using the vector search index.
@@ -1,8 +1,13 @@
 import os
-from typing import Dict
+from typing import Dict, List
 from pinecone import Pinecone, ServerlessSpec
 from IDataManager import IDataManager
 
+# Pinecone recommends upserting at most 100 vectors per request.
+UPSERT_BATCH_SIZE = 100
+# Pinecone accepts at most 1000 IDs per fetch or delete request.
+ID_BATCH_SIZE = 1000
+
 
 class PineconeDataManager(IDataManager):
     def __init__(self, index_name):
@@ -63,4 +68,89 @@ class PineconeDataManager(IDataManager):
         query_vector: The query vector.
         top_k: Number of top similar results to return.
         """
-        return self.index.query(vector=query_vector, top_k=top_k)
+        return self.index.query(vector=query_vector, top_k=top_k, include_metadata=True)
+
+    def scan(self, batch_size=100):
+        """
+        Yield every vector in the index in batches, fetching each batch of IDs with one request.
+        batch_size: Number of vectors per batch.
+        """
+        for ids in self.index.list(limit=batch_size):
+            vectors = self.index.fetch(ids=ids).vectors
+            yield [
+                {"id": vector.id, "vector": list(vector.values), "metadata": vector.metadata or {}}
+                for vector in vectors.values()
+            ]
+
+    def bulk_create(self, records: List[Dict[str, any]]):
+        """
+        Upsert many vectors with their existing IDs, in batches.
+        records: A list of dictionaries with 'id', 'vector', and optional 'metadata'.
+        """
+        for start in range(0, len(records), UPSERT_BATCH_SIZE):
+            self.index.upsert(
+                vectors=[
+                    (record["id"], record["vector"], record.get("metadata", {}))
+                    for record in records[start:start + UPSERT_BATCH_SIZE]
+                ]
+            )
+
+    def list_page(self, cursor=None, limit=100, filter=None):
+        """
+        List one page of vectors with their metadata, using one list request and one fetch request.
+        Serverless indexes can't list by metadata, so the filter is applied to the fetched page.
+        This means a filtered page can hold fewer than limit vectors even when more pages follow.
+        cursor: The pagination token returned by the previous page, or None for the first page.
+        limit: Maximum number of vectors to list, up to 100.
+        filter: Optional dictionary of metadata values that the vectors must match exactly.
+        """
+        response = self.index.list_paginated(limit=limit, pagination_token=cursor)
+        ids = [vector.id for vector in response.vectors]
+        records = self.get_many(ids) if ids else []
+        if filter:
+            records = [
+                record for record in records
+                if all(record["metadata"].get(key) == value for key, value in filter.items())
+            ]
+        next_cursor = response.pagination.next if response.pagination else None
+        return records, next_cursor
+
+    def get_many(self, ids):
+        """
+        Fetch many vectors' metadata by their IDs, up to 1000 IDs per request.
+        ids: The unique IDs of the vectors.
+        """
+        records = []
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            vectors = self.index.fetch(ids=ids[start:start + ID_BATCH_SIZE]).vectors
+            records.extend({"id": vector.id, "metadata": vector.metadata or {}} for vector in vectors.values())
+        return records
+
+    def delete_many(self, ids=None, filter=None):
+        """
+        Delete many vectors by their IDs, or every vector whose metadata matches a filter, and return the IDs that were deleted.
+        Matching by filter deletes each listed page with one request. IDs are fetched first so ones that don't exist aren't returned.
+        ids: The unique IDs of the vectors.
+        filter: Dictionary of metadata values that the vectors must match exactly.
+        """
+        if ids is None:
+            if not filter:
+                raise ValueError("Either ids or a filter is required to delete vectors.")
+            ids = []
+            cursor = None
+            while True:
+                records, cursor = self.list_page(cursor, filter=filter)
+                page_ids = [record["id"] for record in records]
+                if page_ids:
+                    self.index.delete(ids=page_ids)
+                    ids.extend(page_ids)
+                if not cursor:
+                    return ids
+
+        deleted_ids = []
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            existing_ids = list(self.index.fetch(ids=ids[start:start + ID_BATCH_SIZE]).vectors)
+            if existing_ids:
+                self.index.delete(ids=existing_ids)
+                deleted_ids.extend(existing_ids)
+        return deleted_ids
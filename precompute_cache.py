@@ -0,0 +1,167 @@
+import argparse
+import json
+import logging
+import os
+from collections import Counter
+import numpy as np
+from answer_index import AnswerIndex
+from query_log import QUERY_LOG_PATH, read_entries
+
+# Where the precomputed embeddings and answers are written for workers to load. Workers reload it when it changes.
+PRECOMPUTED_CACHE_PATH = os.getenv("PRECOMPUTED_CACHE_PATH", "precomputed_cache.jsonl")
+# Questions whose embeddings are at least this similar are counted as the same question.
+CLUSTER_THRESHOLD = 0.92
+
+
+def count_queries(entries):
+    """
+    Count how often each question was asked, treating questions that only differ in case or punctuation as the same.
+
+    Args:
+        entries (iterable): Query log entries with a "query" key.
+
+    Returns:
+        Counter: The number of times each question was asked, keyed by its first seen wording.
+    """
+    counts = Counter()
+    examples = {}
+    for entry in entries:
+        query = entry.get("query")
+        if query:
+            key = AnswerIndex.normalize(query)
+            examples.setdefault(key, query)
+            counts[examples[key]] += 1
+    return counts
+
+
+def cluster_queries(queries, counts, vectors, threshold=CLUSTER_THRESHOLD):
+    """
+    Group differently worded versions of the same question by the similarity of their embeddings.
+    Questions are visited from most to least frequent and join the first cluster whose representative is similar enough,
+    so each cluster is represented by its most frequently asked wording.
+
+    Args:
+        queries (List[str]): The questions, most frequent first.
+        counts (Counter): The number of times each question was asked.
+        vectors (List[list]): The embedding of each question.
+        threshold (float): The cosine similarity at which two questions are counted as the same.
+
+    Returns:
+        List[dict]: The clusters, most frequently asked first, with their representative query, members and total count.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    # Normalize the rows so a dot product is the cosine similarity
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    clusters = []
+    representatives = []
+    for row, query in enumerate(queries):
+        if representatives:
+            similarities = matrix[representatives] @ matrix[row]
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                clusters[best]["members"].append({"query": query, "vector": vectors[row]})
+                clusters[best]["count"] += counts[query]
+                continue
+        representatives.append(row)
+        clusters.append({"query": query, "count": counts[query], "members": [{"query": query, "vector": vectors[row]}]})
+    return sorted(clusters, key=lambda cluster: cluster["count"], reverse=True)
+
+
+def precompute(chat_engine, top_n=50, log_path=QUERY_LOG_PATH, output_path=PRECOMPUTED_CACHE_PATH):
+    """
+    Find the most frequently asked questions in the query log, then embed and answer them ahead of time.
+
+    Args:
+        chat_engine (ChatEngine): The chat engine used to answer the questions.
+        top_n (int): The number of question clusters to precompute.
+        log_path (str): The query log to read.
+        output_path (str): The JSON lines file to write the clusters to.
+
+    Returns:
+        int: The number of clusters written.
+    """
+    # Answer from the current QA pairs and record which ones they were, so workers holding different QA pairs
+    # don't serve answers that may repeat edited or deleted content
+    data_manager = chat_engine.data_manager
+    data_manager.load_answer_index()
+    corpus_version = data_manager.answer_index.version()
+
+    counts = count_queries(read_entries(log_path))
+    # Embed a few times more candidates than needed, since several wordings can end up in one cluster
+    queries = [query for query, _ in counts.most_common(top_n * 4)]
+    if not queries:
+        return 0
+    vectors = data_manager.create_vector_embeddings_batch(queries)
+    if len(vectors) != len(queries):
+        raise RuntimeError("Could not create embeddings for the logged questions.")
+
+    clusters = cluster_queries(queries, counts, vectors)[:top_n]
+    for cluster in clusters:
+        result = chat_engine.answer(cluster["query"], cluster["members"][0]["vector"])
+        # Only keep answers the LLM actually wrote. Stored answers are already in the answer index, and
+        # "no information" or error responses shouldn't be repeated from the cache.
+        cluster["answer"] = result["bot_response"] if result["usage"] else None
+
+    # Write to a temporary file first so running workers never reload a half written cache
+    with open(f"{output_path}.tmp", "w", encoding="utf-8") as file:
+        file.write(json.dumps({"corpus_version": corpus_version}) + "\n")
+        for cluster in clusters:
+            file.write(json.dumps(cluster) + "\n")
+    os.replace(f"{output_path}.tmp", output_path)
+    return len(clusters)
+
+
+def load_precomputed(data_manager, path=PRECOMPUTED_CACHE_PATH):
+    """
+    Load precomputed embeddings into the embedding cache and precomputed answers into the answer index's precomputed tier.
+    Every wording in a cluster gets its embedding cached, but only the representative wording gets the answer,
+    because the other wordings may be similar questions that need a different answer.
+    The answers are only loaded if they were written from the same QA pairs the answer index holds.
+
+    Args:
+        data_manager (QAManager): The QAManager whose caches should be filled.
+        path (str): The file written by precompute.
+
+    Returns:
+        int: The number of clusters loaded.
+    """
+    loaded = 0
+    corpus_version = None
+    answers = {}
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                cluster = json.loads(line)
+                if "corpus_version" in cluster:
+                    corpus_version = cluster["corpus_version"]
+                    continue
+                for member in cluster["members"]:
+                    data_manager.embedding_cache.put(member["query"], member["vector"])
+                if cluster.get("answer"):
+                    answers[cluster["query"]] = cluster["answer"]
+                loaded += 1
+    except FileNotFoundError:
+        pass
+    # The embeddings only depend on the questions, but the answers depend on the QA pairs they were written from
+    if not data_manager.answer_index.replace_precomputed(answers, corpus_version) and answers:
+        logging.warning(f"Skipped the precomputed answers in {path} because the QA pairs have changed since they were written.")
+    return loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Precompute embeddings and answers for the most frequently asked questions in the query log."
+    )
+    parser.add_argument("--top-n", type=int, default=50, help="The number of question clusters to precompute")
+    parser.add_argument("--log", default=QUERY_LOG_PATH, help="The query log to read")
+    parser.add_argument("--output", default=PRECOMPUTED_CACHE_PATH, help="The file to write the precomputed cache to")
+    args = parser.parse_args()
+
+    # Imported here so the helpers above can be used without the API clients
+    from chat_engine import ChatEngine
+
+    written = precompute(ChatEngine(), args.top_n, args.log, args.output)
+    print(f"Precomputed {written} question clusters to {args.output}")
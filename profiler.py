@@ -0,0 +1,295 @@
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from flask import Blueprint, Response, abort, current_app, g, jsonify, request
+
+# Every gunicorn worker updates the same profile files, so updates are serialised with a file lock.
+# Windows has no fcntl, but it is served by a single waitress process where the thread lock is enough.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Profiling is off unless PROFILING_ENABLED is set, in which case a fraction of requests are sampled.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.01"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Each profile file keeps only this many of its heaviest stacks so it can't grow without bound.
+PROFILE_MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "5000"))
+# Requests sent with this header set to PROFILE_TOKEN are always profiled, using cProfile instead of the sampler.
+# The header is ignored when no token is configured.
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+
+profiles_bp = Blueprint("profiles", __name__)
+
+
+def frame_name(frame):
+    """
+    Describe a stack frame as module:function for a collapsed stack line.
+    """
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class StackSampler:
+    """
+    StackSampler class periodically records the call stack of one thread from a background thread.
+    It only reads the thread's current frame, so the profiled request runs at close to full speed.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        """
+        Initialize the sampler for a thread.
+
+        Args:
+            thread_id (int): The ident of the thread to sample.
+            interval (float): The number of seconds between samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop sampling and return the number of samples seen for each collapsed stack.
+        """
+        self.stopped.set()
+        self.thread.join()
+        return self.stacks
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                # Collapsed stacks go from the outermost call to the innermost
+                self.stacks[";".join(reversed(names))] += 1
+
+
+def collapse_cprofile(profile):
+    """
+    Convert a cProfile run to collapsed caller;callee lines weighted by microseconds of own time.
+    cProfile only records direct callers, so each line is a two-frame stack rather than the full call stack.
+    """
+    stacks = Counter()
+    for (file, line, function), (_, _, own_time, _, callers) in pstats.Stats(profile).stats.items():
+        name = f"{os.path.basename(file)}:{function}"
+        if not callers:
+            stacks[name] += int(own_time * 1_000_000)
+        for (caller_file, caller_line, caller_function), caller_stats in callers.items():
+            # caller_stats[2] is the own time spent in this function when called from this caller
+            stacks[f"{os.path.basename(caller_file)}:{caller_function};{name}"] += int(caller_stats[2] * 1_000_000)
+    return stacks
+
+
+def read_collapsed(path):
+    """
+    Sum the counts of identical stacks in a collapsed stack file.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        Counter: The count of each stack, or None if the file doesn't exist.
+    """
+    stacks = Counter()
+    try:
+        with open(path) as file:
+            for line in file:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack:
+                    stacks[stack] += int(count)
+    except FileNotFoundError:
+        return None
+    return stacks
+
+
+def route_name(rule):
+    """
+    Turn a route pattern such as /get_qa/<question_id> into a name that is safe to use in a file name.
+    """
+    return re.sub(r"[^\w]+", "_", rule).strip("_") or "index"
+
+
+class RequestProfiler:
+    """
+    RequestProfiler class decides which requests to profile and adds their collapsed stacks to one file per route.
+    Sampled profiles and cProfile profiles are kept in separate files because they count in different units.
+    """
+
+    def __init__(
+        self,
+        profile_dir=PROFILE_DIR,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        interval=PROFILE_INTERVAL,
+        token=PROFILE_TOKEN,
+        max_stacks=PROFILE_MAX_STACKS,
+    ):
+        """
+        Initialize the profiler.
+
+        Args:
+            profile_dir (str): The directory to write collapsed stack files to.
+            sample_rate (float): The fraction of requests to profile with the sampler.
+            interval (float): The number of seconds between samples.
+            token (str): The X-Profile header value that forces a cProfile run, or None to ignore the header.
+            max_stacks (int): The number of heaviest stacks each file keeps.
+        """
+        self.profile_dir = profile_dir
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.token = token
+        self.max_stacks = max_stacks
+        self.lock = threading.Lock()
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+    def start(self):
+        """
+        Start profiling the current request if it is forced by the header or picked by the sample rate.
+        """
+        header = request.headers.get(PROFILE_HEADER)
+        # Compare in constant time so the token can't be guessed from response times
+        if self.token and header and hmac.compare_digest(header, self.token):
+            g.profile = cProfile.Profile()
+            g.profile.enable()
+        elif random.random() < self.sample_rate:
+            g.sampler = StackSampler(threading.get_ident(), self.interval)
+            g.sampler.start()
+
+    def stop(self, exception=None):
+        """
+        Stop profiling the current request and save its stacks.
+        """
+        profile = g.pop("profile", None)
+        sampler = g.pop("sampler", None)
+        if profile is not None:
+            profile.disable()
+            self.save("cprofile", collapse_cprofile(profile))
+        elif sampler is not None:
+            self.save("sampled", sampler.stop())
+
+    def save(self, kind, stacks):
+        """
+        Add collapsed stacks to the totals in the file for the current route.
+        The file holds one line per distinct stack and is rewritten with only the heaviest max_stacks,
+        so it stays the same size however many requests are profiled.
+        """
+        # Name the file after the route pattern rather than the URL so /get_qa/<id> requests share a file
+        route = route_name(request.url_rule.rule if request.url_rule else "unmatched")
+        path = os.path.join(self.profile_dir, f"{route}-{kind}.collapsed")
+        with self.lock, self.file_lock():
+            totals = read_collapsed(path) or Counter()
+            totals.update(stacks)
+            # Write to a temporary file first so a download never sees a half written profile
+            with open(f"{path}.tmp", "w") as file:
+                file.write("".join(f"{stack} {count}\n" for stack, count in totals.most_common(self.max_stacks) if count))
+            os.replace(f"{path}.tmp", path)
+
+    @contextmanager
+    def file_lock(self):
+        """
+        Hold an exclusive lock shared by every process writing to the profile directory.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.profile_dir, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def aggregate(self, name):
+        """
+        Sum the counts of identical stacks in a profile file.
+
+        Args:
+            name (str): The file name without the .collapsed extension.
+
+        Returns:
+            str: The aggregated collapsed stacks, ready for flamegraph tools, or None if the file doesn't exist.
+        """
+        stacks = read_collapsed(os.path.join(self.profile_dir, f"{name}.collapsed"))
+        if stacks is None:
+            return None
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def names(self):
+        """
+        List the profile files that have been written, without their extension.
+        """
+        return sorted(file[: -len(".collapsed")] for file in os.listdir(self.profile_dir) if file.endswith(".collapsed"))
+
+
+def init_profiling(app):
+    """
+    Hook the request profiler into the Flask app if profiling is enabled.
+    Nothing is registered when it is disabled, so there is no cost per request.
+    """
+    if not PROFILING_ENABLED:
+        return
+    profiler = RequestProfiler()
+    app.extensions["request_profiler"] = profiler
+    app.before_request(profiler.start)
+    app.teardown_request(profiler.stop)
+    app.register_blueprint(profiles_bp)
+
+
+# Route to list the profiles that have been captured
+@profiles_bp.route("/admin/profiles", methods=["GET"])
+def list_profiles():
+    """
+    This endpoint lists the captured profiles, one per route and profiler kind.
+    ---
+    responses:
+      200:
+        description: Returns the profile names that can be downloaded
+    """
+    return jsonify({"profiles": current_app.extensions["request_profiler"].names()})
+
+
+# Route to download an aggregated profile
+@profiles_bp.route("/admin/profiles/<name>", methods=["GET"])
+def download_profile(name):
+    """
+    This endpoint downloads a profile as aggregated collapsed stacks, which flamegraph.pl or speedscope can render.
+    ---
+    parameters:
+      - name: name
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: The collapsed stacks as plain text
+      404:
+        description: No profile has been captured with that name
+    """
+    # Only allow the names the profiler writes so the path can't leave the profile directory
+    if not re.fullmatch(r"\w+-(sampled|cprofile)", name):
+        abort(404)
+    collapsed = current_app.extensions["request_profiler"].aggregate(name)
+    if collapsed is None:
+        abort(404)
+    return Response(
+        collapsed,
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename={name}.collapsed"},
+    )
@@ -1,6 +1,8 @@
 import os
 import uuid
 from openai import OpenAI
+from answer_index import AnswerIndex
+from embedding_cache import EmbeddingCache
 from IDataManager import IDataManager
 from mongo_data_manager import MongoDataManager
 from pinecone_data_manager import PineconeDataManager
@@ -19,6 +21,12 @@ class QAManager(IDataManager):
         """
         self.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
         self.pinecone_data_manager = PineconeDataManager("cnctechnicalai")
+        # Keep an in-memory index of known questions so exact repeats can skip the LLM.
+        # It is filled from the Pinecone index by load_answer_index and updated straight away by writes through this process.
+        # Other workers only see those writes when they next call load_answer_index, which the warm-up thread repeats.
+        self.answer_index = AnswerIndex()
+        # Cache embeddings of recent and popular questions so they aren't sent to the API again.
+        self.embedding_cache = EmbeddingCache(int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")))
 
     def create(self, data):
         """
@@ -37,37 +45,88 @@ class QAManager(IDataManager):
             "metadata": {"question": question, "answer": answer},
         }
         self.pinecone_data_manager.create(data)
+        self.answer_index.add(question, answer, qa_id)
 
-    def get(self, question):
+    def get(self, qa_id):
         """
-        Fetch a QA pair by its question.
+        Fetch a QA pair by its ID.
 
         Args:
-            question (str): The question text as the ID.
+            qa_id (str): The ID of the QA pair.
+
+        Returns:
+            dict: The QA pair with 'id' and 'metadata' keys, or None if it doesn't exist.
         """
-        return self.pinecone_data_manager.get(question)
+        records = self.pinecone_data_manager.get_many([qa_id])
+        return records[0] if records else None
 
-    def update(self, question, answer):
+    def update(self, qa_id, data):
         """
         Update a QA pair in the Pinecone index.
 
         Args:
-            question (str): The question text as the ID.
-            answer (str): The new answer text.
+            qa_id (str): The ID of the QA pair.
+            data (dict): A dictionary containing the new question and answer text.
         """
+        (question, answer) = data["question"], data["answer"]
+
         question_vector = self.create_vector_embeddings(question)
         self.pinecone_data_manager.update(
-            question, {"vector": question_vector, "metadata": {"answer": answer}}
+            qa_id, {"vector": question_vector, "metadata": {"question": question, "answer": answer}}
         )
+        self.answer_index.add(question, answer, qa_id)
 
-    def delete(self, question):
+    def delete(self, qa_id):
         """
         Delete a QA pair from the Pinecone index.
 
         Args:
-            question (str): The question text as the ID.
+            qa_id (str): The ID of the QA pair.
+        """
+        self.pinecone_data_manager.delete(qa_id)
+        self.answer_index.remove(qa_id)
+
+    def list_page(self, cursor=None, limit=100, filter=None):
+        """
+        List one page of QA pairs.
+
+        Args:
+            cursor (str): The cursor returned with the previous page, or None for the first page.
+            limit (int): Maximum number of QA pairs to list, up to 100.
+            filter (dict): Optional metadata values, such as the question, that the QA pairs must match exactly.
+
+        Returns:
+            tuple: The page of QA pairs and the cursor for the next page, or None on the last page.
+        """
+        return self.pinecone_data_manager.list_page(cursor, limit, filter)
+
+    def get_many(self, qa_ids):
+        """
+        Fetch many QA pairs by their IDs.
+
+        Args:
+            qa_ids (list): The IDs of the QA pairs.
+
+        Returns:
+            list: The QA pairs that exist, with 'id' and 'metadata' keys.
+        """
+        return self.pinecone_data_manager.get_many(qa_ids)
+
+    def delete_many(self, qa_ids=None, filter=None):
+        """
+        Delete many QA pairs by their IDs, or every QA pair whose metadata matches a filter.
+
+        Args:
+            qa_ids (list): The IDs of the QA pairs.
+            filter (dict): Metadata values that the QA pairs must match exactly.
+
+        Returns:
+            list: The IDs of the deleted QA pairs.
         """
-        self.pinecone_data_manager.delete(question)
+        deleted_ids = self.pinecone_data_manager.delete_many(qa_ids, filter)
+        for qa_id in deleted_ids:
+            self.answer_index.remove(qa_id)
+        return deleted_ids
 
     def find(self, query_text, top_k=10):
         """
@@ -80,9 +139,54 @@ class QAManager(IDataManager):
         query_vector = self.create_vector_embeddings(query_text)
         return self.pinecone_data_manager.find(query_vector, top_k)
 
+    def find_by_vector(self, query_vector, top_k=10):
+        """
+        Perform a vector search with an embedding that has already been created.
+
+        Args:
+            query_vector (list): The embedding of the query text.
+            top_k (int): Number of top results to return.
+        """
+        return self.pinecone_data_manager.find(query_vector, top_k)
+
+    def scan(self, batch_size=100):
+        """
+        Yield every QA pair in the Pinecone index with its vector, in batches.
+
+        Args:
+            batch_size (int): Number of QA pairs per batch.
+        """
+        return self.pinecone_data_manager.scan(batch_size)
+
+    def bulk_create(self, records):
+        """
+        Add many QA pairs that already have IDs and vectors, without creating any embeddings.
+
+        Args:
+            records (list): Dictionaries with 'id', 'vector' and 'metadata' containing the question and answer.
+        """
+        self.pinecone_data_manager.bulk_create(records)
+        self.answer_index.add_records(records)
+
+    def load_answer_index(self):
+        """
+        Replace the answer index with every QA pair in the Pinecone index, keyed by their real IDs
+        so later updates and deletes through this class replace or remove them.
+        QA pairs that have been deleted or edited through another worker are dropped or replaced.
+
+        Returns:
+            int: The number of QA pairs loaded.
+        """
+        records = []
+        for batch in self.scan():
+            # The vectors aren't needed for the answer index, so don't hold on to them
+            records.extend({"id": record["id"], "metadata": record["metadata"]} for record in batch)
+        self.answer_index.replace_records(records)
+        return len(records)
+
     def create_vector_embeddings(self, text: str) -> list:
         """
-        Generate embeddings for the given text using OpenAI API.
+        Generate embeddings for the given text using OpenAI API, or reuse them from the cache.
 
         Args:
             text (str): The text to generate embeddings for.
@@ -90,12 +194,43 @@ class QAManager(IDataManager):
         Returns:
             list: The generated embeddings as a list of floats.
         """
+        embedding = self.embedding_cache.get(text)
+        if embedding is not None:
+            return embedding
         try:
             response = self.client.embeddings.create(input=text, model="text-embedding-3-small")
             # Access the embedding data through the object's attributes
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
+            self.embedding_cache.put(text, embedding)
+            return embedding
         except Exception as e:
             print(f"Error in creating vector embeddings: {e}")
             return []
 
+    def create_vector_embeddings_batch(self, texts: list) -> list:
+        """
+        Generate embeddings for many texts with a single OpenAI API call.
+        Texts that are already in the cache aren't sent to the API.
+
+        Args:
+            texts (list): The texts to generate embeddings for.
 
+        Returns:
+            list: One embedding per text in the same order, or an empty list if the call failed.
+        """
+        embeddings = [self.embedding_cache.get(text) for text in texts]
+        missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        if not missing:
+            return embeddings
+        try:
+            response = self.client.embeddings.create(
+                input=[texts[index] for index in missing], model="text-embedding-3-small"
+            )
+            # The API doesn't promise to return the embeddings in order, so sort them by their index
+            for index, item in zip(missing, sorted(response.data, key=lambda item: item.index)):
+                embeddings[index] = item.embedding
+                self.embedding_cache.put(texts[index], item.embedding)
+            return embeddings
+        except Exception as e:
+            print(f"Error in creating vector embeddings: {e}")
+            return []
@@ -0,0 +1,192 @@
+import argparse
+import io
+import json
+import zipfile
+import numpy as np
+
+# The names of the two files that make up a snapshot inside a zip archive.
+VECTORS_FILE_NAME = "qa_snapshot.npy"
+METADATA_FILE_NAME = "qa_snapshot.jsonl"
+
+
+def write_snapshot(data_manager, vectors_file, metadata_file, batch_size=100):
+    """
+    Write every QA pair in a data manager to a snapshot.
+    The vectors are saved as one float32 NumPy array and the IDs and metadata as JSON lines in the same order.
+    QA pairs that were never embedded can't be restored without an embedding call, so they are skipped and counted.
+
+    Args:
+        data_manager (IDataManager): The data manager to read the QA pairs from.
+        vectors_file: A binary file object to write the .npy vectors to.
+        metadata_file: A text file object to write the JSONL metadata to.
+        batch_size (int): The number of QA pairs to read from the data manager at a time.
+
+    Returns:
+        tuple: The number of QA pairs written and the number skipped because they had no vector.
+    """
+    vectors = []
+    skipped = 0
+    for batch in data_manager.scan(batch_size):
+        for record in batch:
+            if not record["vector"]:
+                skipped += 1
+                continue
+            if vectors and len(record["vector"]) != len(vectors[0]):
+                raise ValueError(
+                    f"QA pair {record['id']} has {len(record['vector'])} dimensions but others have {len(vectors[0])}."
+                )
+            vectors.append(record["vector"])
+            # Mongo documents can contain values like dates that JSON can't represent, so store them as strings
+            metadata_file.write(json.dumps({"id": record["id"], "metadata": record["metadata"]}, default=str) + "\n")
+    if skipped:
+        print(f"Skipped {skipped} QA pairs without a vector.")
+    np.save(vectors_file, np.asarray(vectors, dtype=np.float32))
+    return len(vectors), skipped
+
+
+def read_snapshot(vectors_file, metadata_file):
+    """
+    Read the QA pairs from a snapshot.
+
+    Args:
+        vectors_file: A binary file object containing the .npy vectors.
+        metadata_file: A text file object containing the JSONL metadata.
+
+    Returns:
+        list: The QA pairs as dictionaries with 'id', 'vector' and 'metadata' keys.
+    """
+    vectors = np.load(vectors_file)
+    lines = [json.loads(line) for line in metadata_file if line.strip()]
+    if len(lines) != len(vectors):
+        raise ValueError(f"Snapshot has {len(vectors)} vectors but {len(lines)} metadata lines.")
+    return [
+        {"id": line["id"], "vector": vector.tolist(), "metadata": line["metadata"]}
+        for line, vector in zip(lines, vectors)
+    ]
+
+
+def load_records(data_manager, records, batch_size=100):
+    """
+    Bulk load QA pairs into a data manager without creating any embeddings.
+
+    Args:
+        data_manager (IDataManager): The data manager to load the QA pairs into.
+        records (list): The QA pairs read from a snapshot.
+        batch_size (int): The number of QA pairs to send to the data manager at a time.
+
+    Returns:
+        int: The number of QA pairs loaded.
+    """
+    for start in range(0, len(records), batch_size):
+        data_manager.bulk_create(records[start:start + batch_size])
+    return len(records)
+
+
+def export_snapshot(data_manager, path):
+    """
+    Export every QA pair to path.npy and path.jsonl.
+
+    Args:
+        data_manager (IDataManager): The data manager to export.
+        path (str): The snapshot path without an extension.
+
+    Returns:
+        tuple: The number of QA pairs exported and the number skipped because they had no vector.
+    """
+    with open(f"{path}.npy", "wb") as vectors_file, open(f"{path}.jsonl", "w", encoding="utf-8") as metadata_file:
+        return write_snapshot(data_manager, vectors_file, metadata_file)
+
+
+def import_snapshot(data_manager, path):
+    """
+    Import the QA pairs in path.npy and path.jsonl into a data manager.
+
+    Args:
+        data_manager (IDataManager): The data manager to import into.
+        path (str): The snapshot path without an extension.
+
+    Returns:
+        int: The number of QA pairs imported.
+    """
+    with open(f"{path}.npy", "rb") as vectors_file, open(f"{path}.jsonl", encoding="utf-8") as metadata_file:
+        records = read_snapshot(vectors_file, metadata_file)
+    return load_records(data_manager, records)
+
+
+def export_snapshot_zip(data_manager):
+    """
+    Export every QA pair to an in-memory zip archive so it can be downloaded in one file.
+
+    Args:
+        data_manager (IDataManager): The data manager to export.
+
+    Returns:
+        tuple: The zip archive, rewound to the start, and the number of QA pairs skipped because they had no vector.
+    """
+    vectors_file, metadata_file = io.BytesIO(), io.StringIO()
+    _, skipped = write_snapshot(data_manager, vectors_file, metadata_file)
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(VECTORS_FILE_NAME, vectors_file.getvalue())
+        zip_file.writestr(METADATA_FILE_NAME, metadata_file.getvalue())
+    archive.seek(0)
+    return archive, skipped
+
+
+def import_snapshot_zip(data_manager, file):
+    """
+    Import the QA pairs in a zip archive created by export_snapshot_zip.
+
+    Args:
+        data_manager (IDataManager): The data manager to import into.
+        file: A binary file object containing the zip archive.
+
+    Returns:
+        int: The number of QA pairs imported.
+    """
+    with zipfile.ZipFile(file) as zip_file:
+        # np.load needs a seekable file, so read the vectors into memory first
+        vectors_file = io.BytesIO(zip_file.read(VECTORS_FILE_NAME))
+        metadata_file = io.StringIO(zip_file.read(METADATA_FILE_NAME).decode("utf-8"))
+    return load_records(data_manager, read_snapshot(vectors_file, metadata_file))
+
+
+def create_data_manager(args):
+    """
+    Create the data manager chosen on the command line.
+    The imports are done here so only the chosen backend's dependencies and credentials are needed.
+    """
+    if args.backend == "mongo":
+        from mongo_data_manager import MongoDataManager
+
+        return MongoDataManager(args.db, args.collection)
+
+    from qa_manager import QAManager
+
+    return QAManager()
+
+
+if __name__ == "__main__":
+    # Load environment variables for the backend credentials
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Export or import a snapshot of the QA pairs with their vectors.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="The snapshot path without an extension, e.g. backups/qa writes backups/qa.npy and backups/qa.jsonl")
+    parser.add_argument("--backend", choices=["pinecone", "mongo"], default="pinecone")
+    parser.add_argument("--db", help="The MongoDB database name when using the mongo backend")
+    parser.add_argument("--collection", help="The MongoDB collection name when using the mongo backend")
+    args = parser.parse_args()
+
+    if args.backend == "mongo" and not (args.db and args.collection):
+        parser.error("--db and --collection are required with the mongo backend")
+
+    data_manager = create_data_manager(args)
+    if args.command == "export":
+        exported, _ = export_snapshot(data_manager, args.path)
+        print(f"Exported {exported} QA pairs to {args.path}.npy and {args.path}.jsonl")
+    else:
+        print(f"Imported {import_snapshot(data_manager, args.path)} QA pairs from {args.path}.npy and {args.path}.jsonl")
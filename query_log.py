@@ -0,0 +1,214 @@
+import atexit
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+# Every gunicorn worker writes to the same file, so rotation and writes are serialised with a file lock.
+# Windows has no fcntl, but it is served by a single waitress process where the thread lock is enough.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# The file the query log is written to. Rotated files get .1, .2 and so on appended, .1 being the newest.
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "query_log.jsonl")
+QUERY_LOG_MAX_BYTES = int(os.getenv("QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+QUERY_LOG_BACKUP_COUNT = int(os.getenv("QUERY_LOG_BACKUP_COUNT", "5"))
+# The most entries kept in memory waiting to be written. The oldest are dropped if the writer falls behind.
+QUERY_LOG_BUFFER_SIZE = int(os.getenv("QUERY_LOG_BUFFER_SIZE", "10000"))
+# How often, in seconds, buffered entries are written even if a full batch hasn't built up.
+QUERY_LOG_FLUSH_INTERVAL = float(os.getenv("QUERY_LOG_FLUSH_INTERVAL", "5"))
+QUERY_LOG_BATCH_SIZE = 100
+
+
+def embedding_hash(vector):
+    """
+    Hash an embedding so identical embeddings can be recognised in the log without storing the vector.
+
+    Args:
+        vector (list): The embedding.
+
+    Returns:
+        str: The hex digest of the embedding as float32 values, or None if there is no embedding.
+    """
+    if not vector:
+        return None
+    return hashlib.sha1(array("f", vector).tobytes()).hexdigest()
+
+
+def log_files(path=QUERY_LOG_PATH):
+    """
+    List the query log and its rotated files that exist, oldest first.
+    Every numbered backup on disk is included, whatever backup count the writers were configured with.
+    """
+    backups = [file for file in glob.glob(f"{glob.escape(path)}.*") if file.rsplit(".", 1)[1].isdigit()]
+    backups.sort(key=lambda file: int(file.rsplit(".", 1)[1]), reverse=True)
+    return backups + ([path] if os.path.exists(path) else [])
+
+
+def read_entries(path=QUERY_LOG_PATH):
+    """
+    Read every entry in the query log and its rotated files, oldest first.
+    Lines that can't be parsed, such as one cut off by a crash, are skipped.
+
+    Yields:
+        dict: A logged entry.
+    """
+    for file_path in log_files(path):
+        with open(file_path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class QueryLog:
+    """
+    QueryLog class records what customers ask without slowing down the request.
+    Entries go into a bounded in-memory ring buffer and a background thread writes them in batches to a
+    rotating JSON lines file. Several processes can share the file because writing and rotating happen under
+    a file lock.
+    """
+
+    def __init__(
+        self,
+        path=QUERY_LOG_PATH,
+        max_bytes=QUERY_LOG_MAX_BYTES,
+        backup_count=QUERY_LOG_BACKUP_COUNT,
+        buffer_size=QUERY_LOG_BUFFER_SIZE,
+        flush_interval=QUERY_LOG_FLUSH_INTERVAL,
+    ):
+        """
+        Initialize the log and start the background writer.
+
+        Args:
+            path (str): The file to write to.
+            max_bytes (int): The size at which the file is rotated.
+            backup_count (int): The number of rotated files to keep.
+            buffer_size (int): The number of entries kept in memory before the oldest are dropped.
+            flush_interval (float): The maximum number of seconds an entry waits before it is written.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        # Appending to a deque with a maxlen never blocks and drops the oldest entry when it is full
+        self.buffer = deque(maxlen=buffer_size)
+        # The number of entries dropped because the buffer was full, and how many of those have been reported
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.write_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        # Write whatever is left in the buffer when the process exits
+        atexit.register(self.flush)
+
+    def record(self, query, vector=None, matched_ids=None, latencies=None, cache=None):
+        """
+        Add an entry to the log. This only appends to the in-memory buffer.
+
+        Args:
+            query (str): The customer's question.
+            vector (list): The question's embedding, which is logged as a hash.
+            matched_ids (list): The IDs of the QA pairs the vector search returned.
+            latencies (dict): The milliseconds spent in each stage of answering.
+            cache (str): Which cache answered the question, or "miss".
+        """
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(
+            {
+                "timestamp": time.time(),
+                "query": query,
+                "embedding_hash": embedding_hash(vector),
+                "matched_ids": matched_ids or [],
+                "latencies": latencies or {},
+                "cache": cache,
+            }
+        )
+        if len(self.buffer) >= QUERY_LOG_BATCH_SIZE:
+            self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Write every buffered entry to the file, rotating it first if it has grown too large.
+        If the write fails the entries go back into the buffer to be tried again on the next flush.
+        """
+        with self.write_lock:
+            entries = []
+            while self.buffer:
+                entries.append(self.buffer.popleft())
+            if entries:
+                try:
+                    with self.file_lock():
+                        self.rotate_if_needed()
+                        with open(self.path, "a", encoding="utf-8") as file:
+                            file.write("".join(json.dumps(entry) + "\n" for entry in entries))
+                except Exception as e:
+                    print(f"Error in writing the query log: {e}")
+                    self.requeue(entries)
+            if self.dropped > self.reported_dropped:
+                logging.warning(f"Query log dropped {self.dropped - self.reported_dropped} entries because its buffer was full.")
+                self.reported_dropped = self.dropped
+
+    def requeue(self, entries):
+        """
+        Put entries that couldn't be written back at the front of the buffer, oldest first.
+        If there isn't room for all of them the oldest are dropped, the same as when recording into a full buffer.
+        """
+        room = self.buffer.maxlen - len(self.buffer)
+        if len(entries) > room:
+            self.dropped += len(entries) - room
+            entries = entries[len(entries) - room:]
+        self.buffer.extendleft(reversed(entries))
+
+    @contextmanager
+    def file_lock(self):
+        """
+        Hold an exclusive lock shared by every process writing to this log.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def rotate_if_needed(self):
+        """
+        Rename query_log.jsonl to query_log.jsonl.1, shifting older files up and deleting the oldest.
+        This must be called while holding file_lock so two processes don't rotate at the same time.
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+            return
+        for number in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{number}"):
+                os.replace(f"{self.path}.{number}", f"{self.path}.{number + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def stats(self):
+        """
+        Report how many entries are waiting to be written and how many have been dropped.
+        """
+        return {"buffered": len(self.buffer), "dropped": self.dropped}
@@ -1,7 +1,11 @@
 import csv
-from flask import Blueprint, jsonify, request
-from chat_engine import ChatEngine
+import json
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
+from chat_engine import MAX_BATCH_SIZE, ChatEngine
 from qa_manager import QAManager
+from query_log import QueryLog
+from qa_snapshot import export_snapshot_zip, import_snapshot_zip
+import warmup
 import logging
 
 bp = Blueprint("main", __name__)
@@ -9,8 +13,28 @@ bp = Blueprint("main", __name__)
 # The DataManager class is responsible for managing the  pairs in the database.
 # It should be initialized with the MongoDB URI then used by other classes to perform CRUD operations on the database.
 data_manager = QAManager()
+# Record every answered question so popular questions can be precomputed ahead of peak hours.
+query_log = QueryLog()
 # Create an instance of the ChatEngine class for chat functionalities and pass the DataManager instance to it.
-chat_engine = ChatEngine()
+chat_engine = ChatEngine(data_manager, query_log)
+
+
+# Route for the load balancer to check whether this worker has warmed up
+@bp.route("/ready", methods=["GET"])
+def ready():
+    """
+    This endpoint reports whether the worker has finished warming up and should receive traffic.
+    ---
+    responses:
+      200:
+        description: The worker is warm. query_log reports the entries waiting to be written and the number dropped
+      503:
+        description: The worker is still warming up
+    """
+    # Include the query log's counts so dropped entries are visible to monitoring
+    if warmup.ready.is_set():
+        return {"status": "ready", "query_log": query_log.stats()}, 200
+    return {"status": "warming up", "query_log": query_log.stats()}, 503
 
 
 # Route to handle user input and bot responses
@@ -31,15 +55,15 @@ def ask():
               type: string
     responses:
       200:
-        description: Returns the bot's response
+        description: Returns the bot's response, answer_index_hit which is true when a curated answer was returned without calling the LLM, precomputed_hit which is true when an answer precomputed for a popular question was returned, and the prompt, completion and cached token usage when the LLM was called
     """
     try:
         # Retrieve user message from the form
         user_message = request.json["user_message"]
         # Process user message and get bot response
-        bot_response = chat_engine.process_user_input(user_message)
-        # Return bot response with HTTP 200 OK
-        return {"bot_response": bot_response}, 200
+        result = chat_engine.process_user_input(user_message)
+        # Return bot response with HTTP 200 OK, flagging answers that came straight from the answer index
+        return result, 200
 
     except KeyError as e:
         # Log KeyError
@@ -60,6 +84,45 @@ def ask():
         return {"error": str(e)}, 500
 
 
+# Route to answer many questions in one request
+@bp.route("/ask_batch", methods=["POST"])
+def ask_batch():
+    """
+    This endpoint is for answering many questions at once, such as nightly bulk jobs.
+    Results are streamed back as newline-delimited JSON in the order they finish.
+    ---
+    parameters:
+      - name: user_messages
+        in: body
+        schema:
+          type: object
+          required:
+            - user_messages
+          properties:
+            user_messages:
+              type: array
+              items:
+                type: string
+    responses:
+      200:
+        description: One JSON object per line with the question's index and either bot_response, answer_index_hit, precomputed_hit and usage, or error
+      400:
+        description: user_messages is missing, isn't a list of strings, or holds more than 2048 questions
+    """
+    user_messages = (request.get_json(silent=True) or {}).get("user_messages")
+    # Validate the request before starting the stream so errors can still return a status code
+    if not isinstance(user_messages, list) or not all(isinstance(message, str) for message in user_messages):
+        return {"error": "user_messages must be a list of strings"}, 400
+    if len(user_messages) > MAX_BATCH_SIZE:
+        return {"error": f"user_messages can't hold more than {MAX_BATCH_SIZE} questions"}, 400
+
+    def generate():
+        for result in chat_engine.answer_batch(user_messages):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 # Route to add a new question-answer pair
 @bp.route("/add_qa", methods=["POST"])
 def add_qa():
@@ -81,7 +144,9 @@ def add_qa():
 @bp.route("/get_qa/<question_id>", methods=["GET"])
 def get_qa(question_id):
     # Get the question-answer pair from the data manager
-    qa_pair = data_manager.get_qa_pair(question_id)
+    qa_pair = data_manager.get(question_id)
+    if qa_pair is None:
+        return jsonify({"status": "error", "message": "Question-answer pair not found."}), 404
     # Return the question-answer pair
     return jsonify(qa_pair)
 
@@ -93,7 +158,7 @@ def update_qa(question_id):
     new_question = request.json.get("question", "")
     new_answer = request.json.get("answer", "")
     # Update the question-answer pair in the data manager
-    data_manager.update_qa_pair(question_id, new_question, new_answer)
+    data_manager.update(question_id, {"question": new_question, "answer": new_answer})
     # Return a success status
     return jsonify({"status": "success"})
 
@@ -107,6 +172,127 @@ def delete_qa(question_id):
     return jsonify({"status": "success"})
 
 
+def parse_filter(values):
+    """
+    Validate a metadata filter so it can only match plain field values.
+    Operators such as $where are rejected so the filter can't be used to run queries against the database.
+    """
+    if not isinstance(values, dict):
+        raise ValueError("filter must be an object")
+    for key, value in values.items():
+        if key.startswith("$") or not isinstance(value, (str, int, float, bool)):
+            raise ValueError(f"Invalid filter on {key}")
+    return values
+
+
+# Route to list question-answer pairs one page at a time
+@bp.route("/list_qa", methods=["GET"])
+def list_qa():
+    """
+    This endpoint lists the stored question-answer pairs one page at a time.
+    Any query parameter other than cursor and limit filters on that metadata field, e.g. /list_qa?answer=Yes
+    ---
+    parameters:
+      - name: cursor
+        in: query
+        type: string
+        description: The next_cursor returned with the previous page
+      - name: limit
+        in: query
+        type: integer
+        description: The maximum number of pairs to return, from 1 to 100
+    responses:
+      200:
+        description: Returns the page of pairs as items, and next_cursor which is null on the last page
+      400:
+        description: The limit or filter is invalid
+    """
+    try:
+        cursor = request.args.get("cursor")
+        limit = int(request.args.get("limit", 100))
+        if not 1 <= limit <= 100:
+            raise ValueError("limit must be between 1 and 100")
+        filter = parse_filter({key: value for key, value in request.args.items() if key not in ("cursor", "limit")})
+        items, next_cursor = data_manager.list_page(cursor, limit, filter)
+        return jsonify({"items": items, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        logging.error(f"ValueError occurred: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+
+# Route to get many question-answer pairs by ID
+@bp.route("/get_qa_batch", methods=["POST"])
+def get_qa_batch():
+    """
+    This endpoint fetches many question-answer pairs by their IDs.
+    ---
+    parameters:
+      - name: ids
+        in: body
+        schema:
+          type: object
+          required:
+            - ids
+          properties:
+            ids:
+              type: array
+              items:
+                type: string
+    responses:
+      200:
+        description: Returns the pairs that exist as items
+      400:
+        description: ids is missing or isn't a list of strings
+    """
+    ids = (request.get_json(silent=True) or {}).get("ids")
+    if not isinstance(ids, list) or not all(isinstance(id, str) for id in ids):
+        return jsonify({"status": "error", "message": "ids must be a list of strings"}), 400
+    return jsonify({"items": data_manager.get_many(ids)}), 200
+
+
+# Route to delete many question-answer pairs by ID or by filter
+@bp.route("/delete_qa_batch", methods=["POST"])
+def delete_qa_batch():
+    """
+    This endpoint deletes many question-answer pairs, either by their IDs or every pair whose metadata matches a filter.
+    ---
+    parameters:
+      - name: body
+        in: body
+        schema:
+          type: object
+          properties:
+            ids:
+              type: array
+              items:
+                type: string
+            filter:
+              type: object
+    responses:
+      200:
+        description: Returns the IDs of the deleted pairs
+      400:
+        description: Neither valid ids nor a non-empty filter was given
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        ids = body.get("ids")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(id, str) for id in ids):
+                raise ValueError("ids must be a list of strings")
+            deleted_ids = data_manager.delete_many(ids)
+        else:
+            # An empty filter would match everything, so require at least one field
+            filter = parse_filter(body.get("filter"))
+            if not filter:
+                raise ValueError("Either ids or a non-empty filter is required")
+            deleted_ids = data_manager.delete_many(filter=filter)
+        return jsonify({"status": "success", "deleted": deleted_ids}), 200
+    except ValueError as e:
+        logging.error(f"ValueError occurred: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+
 @bp.route("/upload", methods=["POST"])
 def upload_file():
     """
@@ -135,6 +321,37 @@ def upload_file():
     return "File uploaded successfully", 200
 
 
+@bp.route("/export_snapshot", methods=["GET"])
+def export_snapshot():
+    """
+    Endpoint to download every question-answer pair with its vector as a zip archive.
+    The archive can be imported again without creating any embeddings.
+    Pairs without a vector are left out and counted in the X-Skipped-QA-Pairs header.
+    """
+    archive, skipped = export_snapshot_zip(data_manager)
+    response = send_file(archive, mimetype="application/zip", as_attachment=True, download_name="qa_snapshot.zip")
+    # Pairs that were never embedded aren't in the archive, so tell the caller how many were left out
+    response.headers["X-Skipped-QA-Pairs"] = str(skipped)
+    return response
+
+
+@bp.route("/import_snapshot", methods=["POST"])
+def import_snapshot():
+    """
+    Endpoint to upload a zip archive created by /export_snapshot and bulk load it without creating any embeddings.
+    """
+    try:
+        count = import_snapshot_zip(data_manager, request.files["file"])
+        return jsonify({"status": "success", "imported": count}), 200
+    except KeyError as e:
+        # Missing upload or a file missing from the archive
+        logging.error(f"KeyError occurred: {str(e)}")
+        return jsonify({"status": "error", "message": f"Missing file: {str(e)}"}), 400
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @bp.route("/reinitialize", methods=["POST"])
 def reinitialize_collection():
     """
@@ -0,0 +1,102 @@
+from answer_index import AnswerIndex
+
+
+def test_normalize_ignores_case_punctuation_and_whitespace():
+    assert AnswerIndex.normalize("  Does the E5X   ship WORLDWIDE? ") == "does the e5x ship worldwide"
+
+
+def test_lookup_matches_normalized_question():
+    index = AnswerIndex()
+    index.add("Does the E5X ship worldwide?", "Yes.", "qa-1")
+
+    assert index.lookup("does the e5x ship worldwide") == "Yes."
+    assert index.lookup("Does the E5X ship to Mars?") is None
+
+
+def test_remove_by_id_drops_entry():
+    index = AnswerIndex()
+    index.add("Does the E5X ship worldwide?", "Yes.", "qa-1")
+
+    index.remove("qa-1")
+
+    assert index.lookup("Does the E5X ship worldwide?") is None
+    assert len(index) == 0
+
+
+def test_add_with_new_wording_for_same_id_replaces_old_entry():
+    index = AnswerIndex()
+    index.add("Does the E5X ship worldwide?", "Yes.", "qa-1")
+
+    index.add("Does the E5X ship internationally?", "Yes, everywhere.", "qa-1")
+
+    assert index.lookup("Does the E5X ship worldwide?") is None
+    assert index.lookup("Does the E5X ship internationally?") == "Yes, everywhere."
+    assert len(index) == 1
+
+
+def test_add_records_uses_record_ids():
+    index = AnswerIndex()
+    index.add_records(
+        [
+            {"id": "qa-1", "metadata": {"question": "Q one", "answer": "A one"}},
+            {"id": "qa-2", "metadata": {"answer": "No question"}},
+        ]
+    )
+
+    assert index.lookup("q one") == "A one"
+    assert len(index) == 1
+    index.remove("qa-1")
+    assert index.lookup("q one") is None
+
+
+def test_lookup_matches_uses_threshold():
+    index = AnswerIndex(threshold=0.97)
+
+    assert index.lookup_matches([{"score": 0.98, "metadata": {"answer": "Stored"}}]) == "Stored"
+    assert index.lookup_matches([{"score": 0.9, "metadata": {"answer": "Stored"}}]) is None
+    assert index.lookup_matches([]) is None
+
+
+def test_same_question_under_two_ids_survives_removing_either():
+    index = AnswerIndex()
+    index.add("Does the E5X ship worldwide?", "A1", "qa-1")
+    index.add("Does the E5X ship worldwide?", "A2", "qa-2")
+
+    index.remove("qa-1")
+    assert index.lookup("Does the E5X ship worldwide?") == "A2"
+
+    index.add("Does the E5X ship worldwide?", "A1", "qa-1")
+    index.remove("qa-1")
+    assert index.lookup("Does the E5X ship worldwide?") == "A2"
+
+    index.remove("qa-2")
+    assert index.lookup("Does the E5X ship worldwide?") is None
+    assert len(index) == 0
+
+
+def test_replace_records_drops_pairs_deleted_elsewhere():
+    index = AnswerIndex()
+    index.add("Q one", "A one", "qa-1")
+    index.add("Q two", "A two", "qa-2")
+    index.add_precomputed("Popular", "Generated")
+
+    changed = index.replace_records([{"id": "qa-2", "metadata": {"question": "Q two", "answer": "A two, edited"}}])
+
+    assert changed
+    assert index.lookup("Q one") is None
+    assert index.lookup("Q two") == "A two, edited"
+    assert index.lookup_precomputed("Popular") is None
+    index.remove("qa-2")
+    assert len(index) == 0
+
+
+def test_replace_records_with_the_same_pairs_keeps_precomputed_answers():
+    records = [{"id": "qa-1", "metadata": {"question": "Q one", "answer": "A one"}}]
+    index = AnswerIndex()
+    index.add_records(records)
+    index.add_precomputed("Popular", "Generated")
+    version = index.version()
+
+    assert not index.replace_records(records)
+    assert index.version() == version
+    assert index.lookup_precomputed("Popular") == "Generated"
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+import pytest
+
+for module in ("dotenv", "openai", "pinecone", "pymongo"):
+    pytest.importorskip(module)
+
+from answer_index import AnswerIndex
+from chat_engine import ChatEngine
+from embedding_cache import EmbeddingCache
+
+
+class FakeDataManager:
+    def __init__(self, batch_fails=False):
+        self.answer_index = AnswerIndex()
+        self.embedding_cache = EmbeddingCache()
+        self.batch_fails = batch_fails
+        self.embedded = []
+        self.searched = []
+
+    def create_vector_embeddings(self, text):
+        self.embedded.append(text)
+        return [] if text == "unembeddable" else [float(len(text))]
+
+    def create_vector_embeddings_batch(self, texts):
+        return [] if self.batch_fails else [[float(len(text))] for text in texts]
+
+    def find_by_vector(self, query_vector):
+        self.searched.append(query_vector)
+        if query_vector == [float(len("search fails"))]:
+            raise RuntimeError("Pinecone is down")
+        return {"matches": [{"id": "qa-1", "score": 0.5, "metadata": {"answer": "Stored answer"}}]}
+
+
+class FakeCompletions:
+    def create(self, model, messages, temperature):
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, prompt_tokens_details=None)
+        message = SimpleNamespace(content=f"Answer to {messages[-1]['content']}")
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=message)])
+
+
+def make_engine(monkeypatch, data_manager):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    engine = ChatEngine(data_manager)
+    engine.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    return engine
+
+
+def test_answer_batch_reports_a_failing_item_without_failing_the_others(monkeypatch):
+    engine = make_engine(monkeypatch, FakeDataManager())
+    engine.data_manager.answer_index.add("Known question", "Curated", "qa-9")
+
+    results = {result["index"]: result for result in engine.answer_batch(["first", "search fails", "Known question"])}
+
+    assert results[0]["bot_response"] == "Answer to first"
+    assert results[1] == {"index": 1, "error": "Pinecone is down"}
+    assert results[2]["bot_response"] == "Curated"
+    assert results[2]["answer_index_hit"]
+
+
+def test_answer_batch_embeds_each_message_when_the_batch_call_fails(monkeypatch):
+    data_manager = FakeDataManager(batch_fails=True)
+    engine = make_engine(monkeypatch, data_manager)
+
+    results = {result["index"]: result for result in engine.answer_batch(["first", "unembeddable"])}
+
+    assert sorted(data_manager.embedded) == ["first", "unembeddable"]
+    assert results[0]["bot_response"] == "Answer to first"
+    assert "embeddings" in results[1]["error"]
+
+
+def test_answer_does_not_embed_twice_when_the_embedding_fails(monkeypatch):
+    data_manager = FakeDataManager()
+    engine = make_engine(monkeypatch, data_manager)
+
+    result = engine.answer("unembeddable")
+
+    assert result["bot_response"] == "I'm sorry, I don't have information on that topic."
+    assert data_manager.embedded == ["unembeddable"]
+    assert data_manager.searched == []
@@ -0,0 +1,119 @@
+import pytest
+
+pytest.importorskip("pymongo")
+
+from bson.objectid import ObjectId
+from mongo_data_manager import MongoDataManager
+
+
+def sort_key(id):
+    # MongoDB sorts every string before every ObjectId
+    return (1, str(id)) if isinstance(id, ObjectId) else (0, id)
+
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, option) for option in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(key)
+            if "$gt" in condition:
+                # $gt only compares values of the same BSON type
+                if type(value) is not type(condition["$gt"]) or sort_key(value) <= sort_key(condition["$gt"]):
+                    return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if condition.get("$type") == "objectId" and not isinstance(value, ObjectId):
+                return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents.sort(key=lambda document: sort_key(document[key]))
+        return self
+
+    def limit(self, limit):
+        self.documents = self.documents[:limit]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(document) for document in self.documents if matches(document, query)])
+
+    def delete_many(self, query):
+        self.documents = [document for document in self.documents if not matches(document, query)]
+
+
+def make_manager(documents):
+    # Skip __init__ so no MongoDB connection is needed
+    manager = MongoDataManager.__new__(MongoDataManager)
+    manager.collection = FakeCollection(documents)
+    return manager
+
+
+def test_list_page_walks_mixed_string_and_object_ids():
+    object_ids = [ObjectId() for _ in range(3)]
+    string_ids = ["3f2a-uuid", "9b1c-uuid", "a0d4-uuid"]
+    manager = make_manager(
+        [{"_id": id, "question": f"Q {id}", "answer": "A"} for id in object_ids + string_ids]
+    )
+
+    seen = []
+    cursors = []
+    cursor = None
+    while True:
+        records, cursor = manager.list_page(cursor, limit=2)
+        seen.extend(record["id"] for record in records)
+        if not cursor:
+            break
+        cursors.append(cursor)
+
+    assert seen == string_ids + [str(id) for id in object_ids]
+    assert cursors[0] == "str:9b1c-uuid"
+    assert cursors[1].startswith("oid:")
+
+
+def test_list_page_applies_filter():
+    manager = make_manager(
+        [
+            {"_id": ObjectId(), "question": "Q1", "answer": "Yes"},
+            {"_id": ObjectId(), "question": "Q2", "answer": "No"},
+        ]
+    )
+
+    records, cursor = manager.list_page(filter={"answer": "Yes"})
+
+    assert [record["metadata"]["question"] for record in records] == ["Q1"]
+    assert cursor is None
+
+
+def test_delete_many_returns_only_ids_that_existed():
+    object_id = ObjectId()
+    manager = make_manager([{"_id": object_id, "question": "Q"}, {"_id": "uuid-1", "question": "Q"}])
+
+    deleted = manager.delete_many(["uuid-1", "uuid-missing", str(ObjectId())])
+
+    assert deleted == ["uuid-1"]
+    assert [document["_id"] for document in manager.collection.documents] == [object_id]
+
+
+def test_delete_many_requires_ids_or_a_filter():
+    manager = make_manager([{"_id": ObjectId(), "question": "Q"}])
+
+    with pytest.raises(ValueError):
+        manager.delete_many(filter={})
+    assert len(manager.collection.documents) == 1
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("pinecone")
+
+from pinecone_data_manager import PineconeDataManager
+
+
+class FakeIndex:
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    def fetch(self, ids):
+        return SimpleNamespace(vectors={id: SimpleNamespace(id=id, metadata={}) for id in ids if id in self.ids})
+
+    def delete(self, ids):
+        self.ids -= set(ids)
+
+
+def test_delete_many_returns_only_ids_that_existed():
+    # Skip __init__ so no Pinecone connection is needed
+    manager = PineconeDataManager.__new__(PineconeDataManager)
+    manager.index = FakeIndex(["qa-1", "qa-2"])
+
+    assert manager.delete_many(["qa-1", "qa-missing"]) == ["qa-1"]
+    assert manager.index.ids == {"qa-2"}
@@ -0,0 +1,107 @@
+import json
+from answer_index import AnswerIndex
+from embedding_cache import EmbeddingCache
+from precompute_cache import cluster_queries, count_queries, load_precomputed
+
+
+class FakeDataManager:
+    def __init__(self):
+        self.answer_index = AnswerIndex()
+        self.embedding_cache = EmbeddingCache()
+
+
+def write_clusters(path, clusters, corpus_version):
+    lines = [{"corpus_version": corpus_version}] + clusters
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+
+def test_count_queries_groups_trivial_differences():
+    counts = count_queries([{"query": "Price?"}, {"query": "price"}, {"query": "Shipping"}, {}])
+
+    assert counts == {"Price?": 2, "Shipping": 1}
+
+
+def test_cluster_queries_groups_similar_embeddings_under_most_frequent_wording():
+    queries = ["How fast is it", "Price", "How quick is it"]
+    counts = {"How fast is it": 5, "Price": 3, "How quick is it": 1}
+    vectors = [[1.0, 0.0], [0.0, 1.0], [0.99, 0.05]]
+
+    clusters = cluster_queries(queries, counts, vectors, threshold=0.95)
+
+    assert [cluster["query"] for cluster in clusters] == ["How fast is it", "Price"]
+    assert clusters[0]["count"] == 6
+    assert [member["query"] for member in clusters[0]["members"]] == ["How fast is it", "How quick is it"]
+
+
+def test_load_precomputed_only_answers_the_representative_wording(tmp_path):
+    path = tmp_path / "precomputed.jsonl"
+    write_clusters(
+        path,
+        [
+            {
+                "query": "Price of the 1000mm V-slot",
+                "answer": "Generated answer",
+                "members": [
+                    {"query": "Price of the 1000mm V-slot", "vector": [1.0, 0.0]},
+                    {"query": "Price of the 1500mm V-slot", "vector": [0.9, 0.1]},
+                ],
+            }
+        ],
+        FakeDataManager().answer_index.version(),
+    )
+    data_manager = FakeDataManager()
+
+    assert load_precomputed(data_manager, str(path)) == 1
+    assert data_manager.answer_index.lookup_precomputed("price of the 1000mm v-slot") == "Generated answer"
+    assert data_manager.answer_index.lookup_precomputed("Price of the 1500mm V-slot") is None
+    # Precomputed answers are never returned as curated ones
+    assert data_manager.answer_index.lookup("Price of the 1000mm V-slot") is None
+    assert data_manager.embedding_cache.get("Price of the 1500mm V-slot") == [0.9, 0.1]
+
+
+def test_load_precomputed_keeps_curated_answers(tmp_path):
+    path = tmp_path / "precomputed.jsonl"
+    data_manager = FakeDataManager()
+    data_manager.answer_index.add("Do you ship?", "Curated", "qa-1")
+    write_clusters(
+        path,
+        [{"query": "Do you ship?", "answer": "Generated", "members": [{"query": "Do you ship?", "vector": [1.0]}]}],
+        data_manager.answer_index.version(),
+    )
+
+    load_precomputed(data_manager, str(path))
+
+    assert data_manager.answer_index.lookup("Do you ship?") == "Curated"
+    assert data_manager.answer_index.lookup_precomputed("Do you ship?") is None
+
+
+def test_load_precomputed_skips_answers_written_from_other_qa_pairs(tmp_path):
+    path = tmp_path / "precomputed.jsonl"
+    clusters = [{"query": "How fast is it", "answer": "Generated", "members": [{"query": "How fast is it", "vector": [1.0]}]}]
+    write_clusters(path, clusters, FakeDataManager().answer_index.version())
+    data_manager = FakeDataManager()
+    data_manager.answer_index.add("Do you ship?", "Curated", "qa-1")
+
+    assert load_precomputed(data_manager, str(path)) == 1
+    assert data_manager.answer_index.lookup_precomputed("How fast is it") is None
+    # Embeddings don't depend on the QA pairs, so they are still cached
+    assert data_manager.embedding_cache.get("How fast is it") == [1.0]
+
+    # Files written before the version was recorded are treated the same way
+    path.write_text(json.dumps(clusters[0]) + "\n")
+    load_precomputed(data_manager, str(path))
+    assert data_manager.answer_index.lookup_precomputed("How fast is it") is None
+
+
+def test_precomputed_answers_are_dropped_when_qa_pairs_change(tmp_path):
+    index = AnswerIndex()
+    index.add_precomputed("How fast is it", "Generated")
+
+    index.add("Other question", "Curated", "qa-1")
+
+    assert index.lookup_precomputed("How fast is it") is None
+
+    index.add_precomputed("How fast is it", "Generated")
+    index.remove("qa-1")
+
+    assert index.lookup_precomputed("How fast is it") is None
@@ -0,0 +1,84 @@
+import cProfile
+import pytest
+from flask import Flask
+from profiler import RequestProfiler, collapse_cprofile, profiles_bp, route_name
+
+
+def busy():
+    return sum(range(1000))
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    profiler = RequestProfiler(str(tmp_path), sample_rate=0, token="secret", max_stacks=2)
+    app.extensions["request_profiler"] = profiler
+    app.before_request(profiler.start)
+    app.teardown_request(profiler.stop)
+    app.register_blueprint(profiles_bp)
+
+    @app.route("/get_qa/<question_id>")
+    def get_qa(question_id):
+        busy()
+        return "ok"
+
+    return app
+
+
+def test_collapse_cprofile_records_caller_and_callee():
+    profile = cProfile.Profile()
+    profile.enable()
+    busy()
+    profile.disable()
+
+    stacks = collapse_cprofile(profile)
+
+    # busy's caller ran before profiling started, so it is a root with its own time
+    assert "test_profiler.py:busy" in stacks
+    assert "test_profiler.py:busy;~:<built-in method builtins.sum>" in stacks
+    assert all(count >= 0 for count in stacks.values())
+
+
+def test_route_name_is_safe_for_file_names():
+    assert route_name("/get_qa/<question_id>") == "get_qa_question_id"
+    assert route_name("/") == "index"
+
+
+def test_aggregate_sums_identical_stacks(tmp_path):
+    (tmp_path / "ask-sampled.collapsed").write_text("a;b 2\na;c 1\na;b 3\n")
+    profiler = RequestProfiler(str(tmp_path))
+
+    assert profiler.aggregate("ask-sampled") == "a;b 5\na;c 1\n"
+    assert profiler.aggregate("missing-sampled") is None
+
+
+def test_save_keeps_only_the_heaviest_stacks(app, tmp_path):
+    profiler = app.extensions["request_profiler"]
+
+    with app.test_request_context("/get_qa/1"):
+        app.preprocess_request()
+        profiler.save("sampled", {"a;b": 3, "a;c": 1})
+        profiler.save("sampled", {"a;b": 1, "a;d": 2})
+
+    assert (tmp_path / "get_qa_question_id-sampled.collapsed").read_text() == "a;b 4\na;d 2\n"
+
+
+def test_header_only_forces_cprofile_with_the_token(app, tmp_path):
+    client = app.test_client()
+
+    client.get("/get_qa/1", headers={"X-Profile": "1"})
+    assert app.extensions["request_profiler"].names() == []
+
+    client.get("/get_qa/1", headers={"X-Profile": "secret"})
+    assert app.extensions["request_profiler"].names() == ["get_qa_question_id-cprofile"]
+    assert client.get("/admin/profiles/get_qa_question_id-cprofile").status_code == 200
+
+
+def test_download_rejects_names_the_profiler_does_not_write(app, tmp_path):
+    (tmp_path / "notes.collapsed").write_text("a 1\n")
+    client = app.test_client()
+
+    assert client.get("/admin/profiles/notes").status_code == 404
+    assert client.get("/admin/profiles/ask-flamegraph").status_code == 404
+    assert client.get("/admin/profiles/..%2Fsecret-sampled").status_code == 404
+    assert client.get("/admin/profiles/ask-sampled").status_code == 404
@@ -0,0 +1,55 @@
+import io
+import pytest
+from qa_snapshot import export_snapshot_zip, import_snapshot_zip, read_snapshot, write_snapshot
+
+
+class FakeDataManager:
+    def __init__(self, batches):
+        self.batches = batches
+        self.created = []
+
+    def scan(self, batch_size=100):
+        return iter(self.batches)
+
+    def bulk_create(self, records):
+        self.created.extend(records)
+
+
+def test_zip_round_trip_keeps_ids_vectors_and_metadata():
+    source = FakeDataManager(
+        [
+            [{"id": "a", "vector": [0.5, 0.25], "metadata": {"question": "Q", "answer": "A"}}],
+            [{"id": "b", "vector": [1.0, 0.0], "metadata": {}}],
+        ]
+    )
+    archive, skipped = export_snapshot_zip(source)
+
+    target = FakeDataManager([])
+    assert import_snapshot_zip(target, archive) == 2
+    assert skipped == 0
+    assert target.created == [
+        {"id": "a", "vector": [0.5, 0.25], "metadata": {"question": "Q", "answer": "A"}},
+        {"id": "b", "vector": [1.0, 0.0], "metadata": {}},
+    ]
+
+
+def test_records_without_vectors_are_skipped():
+    source = FakeDataManager(
+        [[{"id": "a", "vector": [0.5, 0.25], "metadata": {}}, {"id": "b", "vector": [], "metadata": {}}]]
+    )
+    vectors_file, metadata_file = io.BytesIO(), io.StringIO()
+
+    assert write_snapshot(source, vectors_file, metadata_file) == (1, 1)
+
+    vectors_file.seek(0)
+    metadata_file.seek(0)
+    assert [record["id"] for record in read_snapshot(vectors_file, metadata_file)] == ["a"]
+
+
+def test_mismatched_dimensions_are_rejected():
+    source = FakeDataManager(
+        [[{"id": "a", "vector": [0.5, 0.25], "metadata": {}}, {"id": "b", "vector": [1.0], "metadata": {}}]]
+    )
+
+    with pytest.raises(ValueError):
+        write_snapshot(source, io.BytesIO(), io.StringIO())
@@ -0,0 +1,93 @@
+import threading
+from query_log import QueryLog, embedding_hash, log_files, read_entries
+
+
+def make_log(path, **kwargs):
+    # A long flush interval keeps the background writer out of the way so the tests flush explicitly
+    return QueryLog(str(path), flush_interval=3600, **kwargs)
+
+
+def test_rotate_if_needed_shifts_backups_and_drops_the_oldest(tmp_path):
+    path = tmp_path / "query_log.jsonl"
+    query_log = make_log(path, max_bytes=10, backup_count=2)
+    path.write_text("current entries\n")
+    (tmp_path / "query_log.jsonl.1").write_text("newer backup\n")
+    (tmp_path / "query_log.jsonl.2").write_text("oldest backup\n")
+
+    query_log.rotate_if_needed()
+
+    assert not path.exists()
+    assert (tmp_path / "query_log.jsonl.1").read_text() == "current entries\n"
+    assert (tmp_path / "query_log.jsonl.2").read_text() == "newer backup\n"
+    assert not (tmp_path / "query_log.jsonl.3").exists()
+
+
+def test_rotate_if_needed_leaves_small_files_alone(tmp_path):
+    path = tmp_path / "query_log.jsonl"
+    query_log = make_log(path, max_bytes=1000)
+    path.write_text("small\n")
+
+    query_log.rotate_if_needed()
+
+    assert path.read_text() == "small\n"
+    assert not (tmp_path / "query_log.jsonl.1").exists()
+
+
+def test_flush_writes_entries_across_rotations(tmp_path):
+    path = tmp_path / "query_log.jsonl"
+    query_log = make_log(path, max_bytes=200, backup_count=10)
+
+    for number in range(10):
+        query_log.record(f"question {number}", [0.5], ["qa-1"], {"total_ms": 1.0}, "miss")
+        query_log.flush()
+
+    assert len(log_files(str(path))) > 1
+    entries = list(read_entries(str(path)))
+    assert [entry["query"] for entry in entries] == [f"question {number}" for number in range(10)]
+    assert entries[0]["embedding_hash"] == embedding_hash([0.5])
+
+
+def test_workers_sharing_a_file_rotate_without_losing_entries(tmp_path):
+    path = tmp_path / "query_log.jsonl"
+    # Each QueryLog stands in for a separate worker writing to the same path
+    workers = [make_log(path, max_bytes=300, backup_count=1000) for _ in range(4)]
+
+    def write(worker, name):
+        for number in range(50):
+            worker.record(f"{name} {number}")
+            worker.flush()
+
+    threads = [threading.Thread(target=write, args=(worker, f"worker {index}")) for index, worker in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(not worker.buffer for worker in workers)
+    assert len(list(read_entries(str(path)))) == 200
+
+
+def test_failed_write_puts_entries_back_in_the_buffer(tmp_path):
+    path = tmp_path / "missing" / "query_log.jsonl"
+    query_log = make_log(path)
+    query_log.record("first")
+    query_log.record("second")
+
+    query_log.flush()
+
+    assert [entry["query"] for entry in query_log.buffer] == ["first", "second"]
+
+    (tmp_path / "missing").mkdir()
+    query_log.flush()
+
+    assert [entry["query"] for entry in read_entries(str(path))] == ["first", "second"]
+
+
+def test_full_buffer_drops_oldest_and_counts_them(tmp_path):
+    query_log = make_log(tmp_path / "query_log.jsonl", buffer_size=2)
+
+    for query in ["first", "second", "third"]:
+        query_log.record(query)
+
+    assert [entry["query"] for entry in query_log.buffer] == ["second", "third"]
+    assert query_log.stats() == {"buffered": 2, "dropped": 1}
@@ -0,0 +1,107 @@
+import pytest
+
+for module in ("dotenv", "openai", "pinecone", "pymongo"):
+    pytest.importorskip(module)
+
+from flask import Flask
+
+
+class FakeDataManager:
+    def __init__(self, records=()):
+        self.records = {record["id"]: record for record in records}
+        self.calls = []
+
+    def list_page(self, cursor=None, limit=100, filter=None):
+        self.calls.append(("list_page", cursor, limit, filter))
+        return list(self.records.values())[:limit], None
+
+    def get_many(self, ids):
+        return [self.records[id] for id in ids if id in self.records]
+
+    def delete_many(self, ids=None, filter=None):
+        self.calls.append(("delete_many", ids, filter))
+        return [id for id in ids or [] if self.records.pop(id, None)]
+
+
+@pytest.fixture(scope="module")
+def routes():
+    # routes creates its QAManager when it is imported, so swap in a fake that doesn't connect to Pinecone
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        import qa_manager
+
+        monkeypatch.setattr(qa_manager, "QAManager", FakeDataManager)
+        import routes
+    return routes
+
+
+@pytest.fixture
+def data_manager(routes, monkeypatch):
+    data_manager = FakeDataManager(
+        [{"id": "qa-1", "metadata": {"question": "Q1", "answer": "Yes"}}, {"id": "qa-2", "metadata": {"question": "Q2", "answer": "No"}}]
+    )
+    monkeypatch.setattr(routes, "data_manager", data_manager)
+    return data_manager
+
+
+@pytest.fixture
+def client(routes, data_manager):
+    app = Flask(__name__)
+    app.register_blueprint(routes.bp)
+    return app.test_client()
+
+
+def test_parse_filter_rejects_operators_and_nested_values(routes):
+    assert routes.parse_filter({"answer": "Yes"}) == {"answer": "Yes"}
+    for values in ({"$where": "1"}, {"answer": {"$ne": "Yes"}}, {"answer": ["Yes"]}, ["answer"]):
+        with pytest.raises(ValueError):
+            routes.parse_filter(values)
+
+
+def test_list_qa_passes_cursor_limit_and_filter(client, data_manager):
+    response = client.get("/list_qa?cursor=abc&limit=1&answer=Yes")
+
+    assert response.status_code == 200
+    assert response.json == {"items": [{"id": "qa-1", "metadata": {"question": "Q1", "answer": "Yes"}}], "next_cursor": None}
+    assert data_manager.calls == [("list_page", "abc", 1, {"answer": "Yes"})]
+
+
+def test_list_qa_rejects_bad_limit_and_operator_filters(client, data_manager):
+    assert client.get("/list_qa?limit=0").status_code == 400
+    assert client.get("/list_qa?limit=many").status_code == 400
+    assert client.get("/list_qa?$where=1").status_code == 400
+    assert data_manager.calls == []
+
+
+def test_get_qa_batch_returns_existing_pairs(client):
+    response = client.post("/get_qa_batch", json={"ids": ["qa-2", "qa-missing"]})
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json["items"]] == ["qa-2"]
+    assert client.post("/get_qa_batch", json={"ids": "qa-1"}).status_code == 400
+
+
+def test_delete_qa_batch_by_ids(client, data_manager):
+    response = client.post("/delete_qa_batch", json={"ids": ["qa-1", "qa-missing"]})
+
+    assert response.status_code == 200
+    assert response.json["deleted"] == ["qa-1"]
+
+
+def test_delete_qa_batch_refuses_empty_or_operator_filters(client, data_manager):
+    for body in ({}, {"filter": {}}, {"filter": {"$where": "1"}}, {"ids": [1]}):
+        assert client.post("/delete_qa_batch", json=body).status_code == 400
+    assert data_manager.calls == []
+    assert len(data_manager.records) == 2
+
+
+def test_delete_qa_batch_by_filter(client, data_manager):
+    assert client.post("/delete_qa_batch", json={"filter": {"answer": "No"}}).status_code == 200
+    assert data_manager.calls == [("delete_many", None, {"answer": "No"})]
+
+
+def test_ask_batch_rejects_more_than_the_embeddings_api_accepts(client, routes):
+    response = client.post("/ask_batch", json={"user_messages": ["Q"] * (routes.MAX_BATCH_SIZE + 1)})
+
+    assert response.status_code == 400
+    assert client.post("/ask_batch", json={"user_messages": "Q"}).status_code == 400
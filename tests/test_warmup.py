@@ -0,0 +1,48 @@
+import json
+import os
+import pytest
+import warmup
+from answer_index import AnswerIndex
+from embedding_cache import EmbeddingCache
+
+
+class FakeDataManager:
+    def __init__(self):
+        self.answer_index = AnswerIndex()
+        self.embedding_cache = EmbeddingCache()
+
+
+@pytest.fixture(autouse=True)
+def reset_precomputed_state(monkeypatch):
+    monkeypatch.setattr(warmup, "precomputed_state", {"mtime": None, "version": None})
+
+
+def write_cache(path, answer, corpus_version, mtime):
+    cluster = {"query": "How fast is it", "answer": answer, "members": [{"query": "How fast is it", "vector": [1.0]}]}
+    path.write_text(json.dumps({"corpus_version": corpus_version}) + "\n" + json.dumps(cluster) + "\n")
+    os.utime(path, (mtime, mtime))
+
+
+def test_reload_precomputed_picks_up_a_rewritten_file(tmp_path):
+    path = tmp_path / "precomputed.jsonl"
+    data_manager = FakeDataManager()
+    write_cache(path, "First", data_manager.answer_index.version(), 1000)
+
+    warmup.reload_precomputed(data_manager, str(path))
+    assert data_manager.answer_index.lookup_precomputed("How fast is it") == "First"
+
+    write_cache(path, "Second", data_manager.answer_index.version(), 2000)
+    warmup.reload_precomputed(data_manager, str(path))
+    assert data_manager.answer_index.lookup_precomputed("How fast is it") == "Second"
+
+
+def test_reload_precomputed_keeps_answers_dropped_after_qa_pairs_change(tmp_path):
+    path = tmp_path / "precomputed.jsonl"
+    data_manager = FakeDataManager()
+    write_cache(path, "Generated", data_manager.answer_index.version(), 1000)
+    warmup.reload_precomputed(data_manager, str(path))
+
+    data_manager.answer_index.add("Do you ship?", "Curated", "qa-1")
+    warmup.reload_precomputed(data_manager, str(path))
+
+    assert data_manager.answer_index.lookup_precomputed("How fast is it") is None
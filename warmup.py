@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import threading
+import time
+from precompute_cache import PRECOMPUTED_CACHE_PATH, count_queries, load_precomputed
+from query_log import QUERY_LOG_PATH, read_entries
+
+# The number of most frequent past questions to embed during warm-up.
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "50"))
+# An optional snapshot (without its extension) whose QA pairs are loaded into the answer index if Pinecone can't be read.
+ANSWER_INDEX_SNAPSHOT = os.getenv("ANSWER_INDEX_SNAPSHOT")
+
+# How often, in seconds, each worker reloads the answer index from Pinecone. Every gunicorn worker keeps its own index,
+# so a QA pair edited or deleted through one worker can still be answered from another's index for up to this long.
+ANSWER_INDEX_SYNC_INTERVAL = float(os.getenv("ANSWER_INDEX_SYNC_INTERVAL", "60"))
+
+# The modification time of the precomputed cache and the version of the QA pairs when it was last loaded,
+# so the sync only reloads it when the nightly job rewrites it or the QA pairs change.
+precomputed_state = {"mtime": None, "version": None}
+
+# Set once the warm-up has finished so /ready can tell the load balancer this worker can take traffic.
+ready = threading.Event()
+
+
+def read_top_queries(path, top_n):
+    """
+    Find the most frequently asked questions in the query log and its rotated files.
+    Questions that only differ in case or punctuation are counted together.
+
+    Args:
+        path (str): The path to the query log.
+        top_n (int): The number of questions to return.
+
+    Returns:
+        List[str]: The most frequent questions, most frequent first.
+    """
+    return [query for query, _ in count_queries(read_entries(path)).most_common(top_n)]
+
+
+def load_snapshot_into_answer_index(answer_index, path):
+    """
+    Load the QA pairs from a snapshot's metadata file into the answer index.
+    The vectors aren't needed for this, so only the .jsonl file is read.
+
+    Args:
+        answer_index (AnswerIndex): The answer index to load into.
+        path (str): The snapshot path without an extension.
+    """
+    with open(f"{path}.jsonl", encoding="utf-8") as file:
+        answer_index.add_records(json.loads(line) for line in file if line.strip())
+
+
+def reload_precomputed(data_manager, path=PRECOMPUTED_CACHE_PATH):
+    """
+    Load the precomputed cache if the file or the QA pairs have changed since it was last loaded.
+
+    Args:
+        data_manager (QAManager): The QAManager whose caches should be filled.
+        path (str): The file written by the precompute job.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    version = data_manager.answer_index.version()
+    if precomputed_state == {"mtime": mtime, "version": version}:
+        return
+    load_precomputed(data_manager, path)
+    precomputed_state.update(mtime=mtime, version=version)
+
+
+def warm_up(chat_engine):
+    """
+    Open connections and fill the caches so the first real request is as fast as later ones.
+    Each step is best effort: a failure is logged and the worker is still marked ready, because serving cold
+    is better than not serving at all.
+
+    Args:
+        chat_engine (ChatEngine): The chat engine the routes use, along with its QAManager.
+    """
+    data_manager = chat_engine.data_manager
+
+    try:
+        # Fill the answer index from the vector store so its entries carry the real QA pair IDs
+        data_manager.load_answer_index()
+    except Exception as e:
+        logging.error(f"Warm-up could not load the answer index: {str(e)}")
+        # The snapshot can be older than Pinecone, so it is only a fallback for when Pinecone can't be read.
+        # The periodic sync replaces it with the live QA pairs once Pinecone is reachable again.
+        if ANSWER_INDEX_SNAPSHOT:
+            try:
+                load_snapshot_into_answer_index(data_manager.answer_index, ANSWER_INDEX_SNAPSHOT)
+            except Exception as e:
+                logging.error(f"Warm-up could not load the answer index snapshot: {str(e)}")
+
+    try:
+        # Embeddings and answers precomputed for popular questions ahead of peak hours
+        reload_precomputed(data_manager)
+    except Exception as e:
+        logging.error(f"Warm-up could not load the precomputed cache: {str(e)}")
+
+    try:
+        # Describing the index opens the connection pool to the index host
+        data_manager.pinecone_data_manager.index.describe_index_stats()
+    except Exception as e:
+        logging.error(f"Warm-up could not reach Pinecone: {str(e)}")
+
+    try:
+        # Embedding the popular questions opens the embeddings client's connections and fills the embedding cache.
+        # Questions already loaded from the precomputed cache aren't embedded again.
+        top_queries = read_top_queries(QUERY_LOG_PATH, WARMUP_TOP_N)
+        if top_queries:
+            data_manager.create_vector_embeddings_batch(top_queries)
+        # Open both clients' connections even if every popular question was already cached
+        data_manager.client.models.list()
+        chat_engine.client.models.list()
+    except Exception as e:
+        logging.error(f"Warm-up could not reach OpenAI: {str(e)}")
+
+    logging.info(f"Warm-up finished with {len(data_manager.embedding_cache)} cached embeddings.")
+    ready.set()
+
+
+def sync(chat_engine):
+    """
+    Reload the answer index from Pinecone so edits and deletes made through other workers are picked up,
+    then reload the precomputed cache if the precompute job has rewritten it or the QA pairs have changed.
+    A failure is logged and the current caches are kept until the next try.
+
+    Args:
+        chat_engine (ChatEngine): The chat engine the routes use, along with its QAManager.
+    """
+    try:
+        chat_engine.data_manager.load_answer_index()
+    except Exception as e:
+        logging.error(f"Could not sync the answer index: {str(e)}")
+
+    try:
+        reload_precomputed(chat_engine.data_manager)
+    except Exception as e:
+        logging.error(f"Could not reload the precomputed cache: {str(e)}")
+
+
+def run(chat_engine, interval=ANSWER_INDEX_SYNC_INTERVAL):
+    """
+    Warm up, then keep the answer index in sync for as long as the worker runs.
+
+    Args:
+        chat_engine (ChatEngine): The chat engine the routes use.
+        interval (float): The number of seconds between syncs.
+    """
+    warm_up(chat_engine)
+    while True:
+        time.sleep(interval)
+        sync(chat_engine)
+
+
+def start_warm_up(chat_engine):
+    """
+    Run the warm-up and the periodic sync in a background thread so the worker can start serving health checks straight away.
+
+    Args:
+        chat_engine (ChatEngine): The chat engine the routes use.
+    """
+    threading.Thread(target=run, args=(chat_engine,), daemon=True).start()